@@ -1,222 +1,299 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import random
-from itertools import combinations
 import altair as alt
 import numpy as np
-import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Alias para no chocar con las variables equipos y estadisticas de las pestañas
+from picadito import directorio as tabla_jugadores, equipos as armado_equipos, escritor, estadisticas as calculo_estadisticas, historial, metricas, repositorio, tareas
+from picadito.balanceo import LIMITE_BUSQUEDA_EXACTA, LIMITE_EVALUACION_COMPLETA
 
 
 # Configurar el título de la página
 st.set_page_config(page_title="Picadito App ⚽")
 
-# Conexión a la base de datos
-conn = sqlite3.connect('picadito.db')
-c = conn.cursor()
+# Medición opcional, con ?debug=1 en la URL: tiempo, consultas y pasos de SQLite por rerun, pestaña y función.
+# Los ganchos se instalan una sola vez, al crear la conexión, y sólo en conexiones que usa un hilo por vez
+@st.cache_resource
+def obtener_medidor():
+    return metricas.Medidor()
+
+# Conexión de lectura: una sola por proceso, compartida entre reruns y sesiones (y por eso sin ganchos)
+@st.cache_resource
+def obtener_conexion():
+    return repositorio.conectar('picadito.db')
+
+# Versión de los datos para las lecturas cacheadas: PRAGMA data_version de la conexión compartida cambia cada vez
+# que otra conexión confirma una escritura, sea el escritor de la app, la línea de comandos o el servicio HTTP
+def version_datos():
+    return conexion_compartida.execute("PRAGMA data_version").fetchone()[0]
+
+# Todas las escrituras pasan por un único hilo con su propia conexión, en orden de llegada;
+# las lecturas usan conn y, en modo WAL, no esperan a que termine una escritura
+@st.cache_resource
+def obtener_escritor():
+    escritura = escritor.Escritor('picadito.db')
+    # Sólo el hilo del escritor usa su conexión, y todavía no se encoló nada
+    obtener_medidor().enganchar(escritura.conexion)
+    return escritura
 
-# Crear tablas si no existen
-c.execute('''CREATE TABLE IF NOT EXISTS jugadores
-             (id INTEGER PRIMARY KEY, nombre TEXT, posicion TEXT)''')
-c.execute('''CREATE TABLE IF NOT EXISTS partidos
-             (id INTEGER PRIMARY KEY, fecha TEXT, equipo1 TEXT, equipo2 TEXT, goles1 INTEGER, goles2 INTEGER)''')
-c.execute('''CREATE TABLE IF NOT EXISTS equipos_generados
-             (id INTEGER PRIMARY KEY, fecha TEXT, equipo1 TEXT, equipo2 TEXT)''')
-conn.commit()
+conexion_compartida = obtener_conexion()
+escritura = obtener_escritor()
+medidor = obtener_medidor()
+modo_diagnostico = st.query_params.get('debug') == '1'
+if modo_diagnostico:
+    medicion = st.session_state.setdefault('medicion', metricas.Medicion())
+    # Las lecturas de la sesión medida van por una conexión propia con los ganchos: los reruns de una sesión
+    # no se superponen, así que ningún otro hilo ejecuta sentencias en ella
+    if 'conexion_medida' not in st.session_state:
+        st.session_state['conexion_medida'] = repositorio.conectar('picadito.db')
+        medidor.enganchar(st.session_state['conexion_medida'])
+    conn = st.session_state['conexion_medida']
+else:
+    # Al salir del modo diagnóstico se descarta lo medido
+    st.session_state.pop('medicion', None)
+    conexion_medida = st.session_state.pop('conexion_medida', None)
+    if conexion_medida is not None:
+        conexion_medida.close()
+    medicion = None
+    conn = conexion_compartida
+medidor.iniciar_rerun(medicion)
 
-# Funciones auxiliares
+# Funciones auxiliares: la lógica vive en el paquete picadito, acá solo se cachea e invalida
+@medidor.funcion()
 def agregar_jugador(nombre, posicion):
-    c.execute("INSERT INTO jugadores (nombre, posicion) VALUES (?, ?)", (nombre, posicion))
-    conn.commit()
+    escritura.ejecutar(repositorio.agregar_jugador, nombre, posicion)
 
+# Las lecturas se memorizan por versión de datos: un rerun sin escrituras no ejecuta SQL
+@st.cache_data(max_entries=8)
+def leer_jugadores(version):
+    return repositorio.obtener_jugadores(conn)
+
+@medidor.funcion()
 def obtener_jugadores():
-    return pd.read_sql_query("SELECT id, nombre, posicion FROM jugadores ORDER BY nombre", conn)
-
-def obtener_victorias_jugador(jugador):
-    query = """
-    SELECT COUNT(*) as victorias
-    FROM partidos
-    WHERE (equipo1 LIKE ? AND goles1 > goles2) OR (equipo2 LIKE ? AND goles2 > goles1)
-    """
-    result = c.execute(query, (f'%{jugador}%', f'%{jugador}%')).fetchone()
-    return result[0] if result else 0
-
-def generar_equipos_con_progreso(jugadores_disponibles, jugadores_por_equipo, max_defensores, min_mediocampistas, min_delanteros, ponderacion_victorias):
-    # Obtener información de los jugadores
-    jugadores_info = obtener_jugadores()
-    jugadores_info = jugadores_info[jugadores_info['nombre'].isin(jugadores_disponibles)]
-    
-    # Calcular victorias para cada jugador
-    jugadores_info['victorias'] = jugadores_info['nombre'].apply(obtener_victorias_jugador)
-    
-    # Generar todas las combinaciones posibles de equipos
-    todas_combinaciones = list(combinations(jugadores_disponibles, jugadores_por_equipo))
-    
-    mejor_combinacion = None
-    menor_diferencia = float('inf')
-    mejor_victorias_equipo1 = 0
-    mejor_victorias_equipo2 = 0
-    
-    # Crear una barra de progreso
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for i, combo in enumerate(todas_combinaciones[:1000]):
-        # Actualizar la barra de progreso
-        progress = (i + 1) / len(todas_combinaciones[:1000])
-        progress_bar.progress(progress)
-        status_text.text(f"Analizando combinaciones")
-        
-        equipo1 = list(combo)
-        equipo2 = [j for j in jugadores_disponibles if j not in equipo1]
-        
-        # Verificar que ambos equipos tengan el mismo número de jugadores
-        if len(equipo1) != len(equipo2):
-            continue
-        
-        # Verificar restricciones de posiciones
-        posiciones_equipo1 = jugadores_info[jugadores_info['nombre'].isin(equipo1)]['posicion'].tolist()
-        posiciones_equipo2 = jugadores_info[jugadores_info['nombre'].isin(equipo2)]['posicion'].tolist()
-        
-        if (posiciones_equipo1.count('Defensor') > max_defensores or
-            posiciones_equipo2.count('Defensor') > max_defensores or
-            posiciones_equipo1.count('Mediocampista') < min_mediocampistas or
-            posiciones_equipo2.count('Mediocampista') < min_mediocampistas or
-            posiciones_equipo1.count('Delantero') < min_delanteros or
-            posiciones_equipo2.count('Delantero') < min_delanteros):
-            continue
-        
-        # Calcular diferencia de victorias
-        victorias_equipo1 = sum(jugadores_info[jugadores_info['nombre'].isin(equipo1)]['victorias'])
-        victorias_equipo2 = sum(jugadores_info[jugadores_info['nombre'].isin(equipo2)]['victorias'])
-        diferencia = abs(victorias_equipo1 - victorias_equipo2)
-        
-        # Aplicar ponderación de victorias
-        diferencia *= ponderacion_victorias
-        
-        if diferencia < menor_diferencia:
-            menor_diferencia = diferencia
-            mejor_combinacion = (equipo1, equipo2)
-            mejor_victorias_equipo1 = victorias_equipo1
-            mejor_victorias_equipo2 = victorias_equipo2
-        
-        # Simular un pequeño retraso para que la animación sea visible
-        time.sleep(0.01)
+    return leer_jugadores(version_datos())
+
+# Ids, nombres y posiciones de todos los jugadores: los equipos se guardan como ids y se nombran con esta tabla
+@st.cache_data(max_entries=8)
+def leer_directorio(version):
+    return tabla_jugadores.cargar_directorio(conn)
+
+@medidor.funcion()
+def obtener_directorio():
+    return leer_directorio(version_datos())
+
+# Hilos para generar equipos sin bloquear el script, compartidos entre sesiones
+@st.cache_resource
+def obtener_ejecutor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='generacion')
+
+# Últimas generaciones por plantel y parámetros, para reutilizar resultados
+@st.cache_resource
+def obtener_generaciones():
+    return tareas.Generaciones()
+
+@medidor.funcion()
+def iniciar_generacion(jugadores_disponibles, jugadores_por_equipo, max_defensores, min_mediocampistas, min_delanteros, ponderacion_victorias, objetivo='victorias', **criterios):
+    # Los datos se leen acá; el hilo de trabajo sólo corre la búsqueda.
+    # Devuelve la tarea, la función con que esta sesión la suelta y la huella del resultado.
+    pesos, posiciones, diferencias_goles = armado_equipos.obtener_datos_balanceo(conn, jugadores_disponibles, objetivo)
+    # Para planteles medianos se evalúan todas las divisiones y se ofrecen alternativas
+    top = 5 if len(jugadores_disponibles) <= LIMITE_EVALUACION_COMPLETA else 0
+    clave = tareas.clave_generacion(jugadores_disponibles, pesos, posiciones, diferencias_goles, jugadores_por_equipo,
+                                    max_defensores, min_mediocampistas, min_delanteros, ponderacion_victorias,
+                                    objetivo, top, tuple(sorted(criterios.items())))
+    huella = tareas.huella_generacion(clave)
+    # Un resultado guardado en la base evita repetir la búsqueda, incluso tras reiniciar la app.
+    # Se lee en conn para no esperar escrituras encoladas; la marca de uso va a la cola sin esperarla.
+    guardado = repositorio.obtener_resultado_generacion(conn, huella)
+    if guardado is not None:
+        escritura.enviar(repositorio.marcar_resultado_usado, huella)
+        crear = lambda: tareas.GeneracionEquipos.recuperada(jugadores_disponibles, guardado)
+    else:
+        crear = lambda: tareas.GeneracionEquipos(jugadores_disponibles, pesos, posiciones, jugadores_por_equipo,
+                                                 max_defensores, min_mediocampistas, min_delanteros,
+                                                 ponderacion_victorias, top, diferencias_goles=diferencias_goles,
+                                                 **criterios)
+    tarea, soltar = obtener_generaciones().obtener_o_iniciar(clave, crear, obtener_ejecutor())
+    return tarea, soltar, huella
+
+@medidor.funcion()
+def guardar_resultado_generacion(huella, tarea):
+    # Una sola vez por generación, aunque la sigan varias sesiones; la escritura va a la cola sin esperarla
+    tarea.persistida = True
+    escritura.enviar(repositorio.guardar_resultado_generacion, huella, tarea.resultado())
+
+# Progreso de la generación en curso; se refresca solo, sin volver a correr toda la app
+@st.fragment(run_every=0.5)
+def mostrar_generacion_en_curso():
+    generacion = st.session_state.get('generacion')
+    if generacion is None:
+        return
+    tarea = generacion['tarea']
+    if tarea.terminada:
+        st.rerun()
     
-    # Limpiar la barra de progreso y el texto de estado
-    progress_bar.empty()
-    status_text.empty()
+    st.progress(tarea.progreso, text="Analizando combinaciones")
+    if tarea.mejor is not None:
+        _, _, _, diferencia_parcial = tarea.mejor
+        st.caption(f"Mejor división encontrada hasta ahora (menor es más pareja): {diferencia_parcial:.2f}")
     
-    if mejor_combinacion is None:
-        return None
-    else:
-        return mejor_combinacion, mejor_victorias_equipo1, mejor_victorias_equipo2, menor_diferencia
+    # La tarea puede estar compartida con otras sesiones: esta sólo la suelta, y se detiene si nadie más la sigue
+    col_cancelar, col_aceptar = st.columns(2)
+    if col_cancelar.button("Cancelar generación"):
+        generacion['soltar']()
+        del st.session_state['generacion']
+        st.rerun()
+    if col_aceptar.button("Aceptar mejor actual", disabled=tarea.mejor is None):
+        generacion['soltar']()
+        generacion['aceptada'] = tarea.mejor
+        st.rerun()
 
+@medidor.funcion()
 def registrar_partido(fecha, equipo1, equipo2, goles1, goles2):
-    c.execute("INSERT INTO partidos (fecha, equipo1, equipo2, goles1, goles2) VALUES (?, ?, ?, ?, ?)",
-              (fecha, ','.join(equipo1), ','.join(equipo2), goles1, goles2))
-    conn.commit()
+    escritura.ejecutar(repositorio.registrar_partido, fecha, equipo1, equipo2, goles1, goles2)
 
+@medidor.funcion()
+def guardar_jornada(fecha, equipos):
+    escritura.ejecutar(repositorio.guardar_jornada, str(fecha), equipos)
+
+@medidor.funcion()
+def registrar_partido_jornada(cruce_id, goles_local, goles_visitante):
+    escritura.ejecutar(repositorio.registrar_partido_jornada, cruce_id, goles_local, goles_visitante)
+
+@st.cache_data(max_entries=8)
+def leer_jornada(fecha, version):
+    return repositorio.obtener_jornada(conn, fecha)
+
+@medidor.funcion()
+def obtener_jornada(fecha):
+    return leer_jornada(str(fecha), version_datos())
+
+@medidor.funcion()
 def guardar_equipos_generados(fecha, equipo1, equipo2):
-    c.execute("UPDATE equipos_generados SET equipo1=?, equipo2=? WHERE fecha=?", 
-              (','.join(equipo1), ','.join(equipo2), fecha))
-    if c.rowcount == 0:
-        c.execute("INSERT INTO equipos_generados (fecha, equipo1, equipo2) VALUES (?, ?, ?)",
-                  (fecha, ','.join(equipo1), ','.join(equipo2)))
-    conn.commit()
+    escritura.ejecutar(repositorio.guardar_equipos_generados, fecha, equipo1, equipo2)
 
-def obtener_equipos_generados():
-    return pd.read_sql_query("SELECT * FROM equipos_generados", conn)
+@st.cache_data(max_entries=8)
+def leer_equipos_generados_fecha(fecha, version):
+    return repositorio.obtener_equipos_generados_fecha(conn, fecha)
 
+@medidor.funcion()
+def obtener_equipos_generados_fecha(fecha):
+    # Ids de los equipos generados para la fecha, o None
+    return leer_equipos_generados_fecha(str(fecha), version_datos())
+
+@st.cache_data(max_entries=8)
+def leer_estadisticas_jugadores(version):
+    return calculo_estadisticas.obtener_estadisticas_jugadores(conn)
+
+@medidor.funcion()
 def obtener_estadisticas_jugadores():
-    query = """
-    WITH partidos_jugador AS (
-        SELECT 
-            j.id,
-            j.nombre,
-            j.posicion,
-            p.id as partido_id,
-            p.fecha,
-            CASE 
-                WHEN (p.equipo1 LIKE '%' || j.nombre || '%' AND p.goles1 > p.goles2) OR 
-                    (p.equipo2 LIKE '%' || j.nombre || '%' AND p.goles2 > p.goles1) 
-                THEN 1 
-                ELSE 0 
-            END as victoria
-        FROM 
-            jugadores j
-        LEFT JOIN 
-            partidos p ON p.equipo1 LIKE '%' || j.nombre || '%' OR p.equipo2 LIKE '%' || j.nombre || '%'
-    ),
-    racha_preliminar AS (
-        SELECT 
-            id,
-            nombre,
-            posicion,
-            fecha,
-            victoria,
-            -- Calcular la racha de victorias en curso
-            SUM(CASE WHEN victoria = 1 THEN 1 ELSE 0 END) OVER (PARTITION BY id ORDER BY fecha ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) as racha_actual,
-            ROW_NUMBER() OVER (PARTITION BY id ORDER BY fecha DESC) as rn
-        FROM 
-            partidos_jugador
-    ),
-    racha_final AS (
-        SELECT 
-            id,
-            nombre,
-            posicion,
-            MAX(racha_actual) as racha_actual,
-            -- Revisar el resultado del último partido
-            MAX(CASE WHEN rn = 1 THEN victoria END) as ultimo_partido,
-            COUNT(*) as partidos_jugados,
-            SUM(victoria) as victorias
-        FROM 
-            racha_preliminar
-        GROUP BY 
-            id, nombre, posicion
-    )
-    SELECT 
-        id,
-        nombre,
-        posicion,
-        partidos_jugados,
-        victorias,
-        -- Reiniciar la racha si el último partido fue una derrota
-        CASE 
-            WHEN ultimo_partido = 0 THEN 0
-            ELSE racha_actual
-        END as racha_ganadora
-    FROM 
-        racha_final
-    ORDER BY 
-        racha_ganadora DESC, victorias DESC, partidos_jugados DESC
-
-    """
-    df = pd.read_sql_query(query, conn)
-    df['porcentaje_victorias'] = (df['victorias'] / df['partidos_jugados'] * 100).round(2)
-    df['porcentaje_victorias'] = df['porcentaje_victorias'].fillna(0)
-    return df
-
-def obtener_partidos():
-    query = """
-    SELECT id, fecha, equipo1, equipo2, goles1, goles2
-    FROM partidos
-    ORDER BY fecha DESC
-    """
-    return pd.read_sql_query(query, conn)
+    return leer_estadisticas_jugadores(version_datos())
 
+@st.cache_data(max_entries=32)
+def leer_pagina_partidos(version, desde, hasta, jugador_id, limite, offset):
+    # La página con los ids de los participantes de cada partido, para nombrarlos con el directorio
+    partidos = repositorio.obtener_pagina_partidos(conn, desde, hasta, jugador_id, limite, offset)
+    equipos = repositorio.obtener_equipos_partidos(conn, partidos['id'].tolist())
+    partidos['ids_equipo1'] = [equipos[partido_id][0] for partido_id in partidos['id']]
+    partidos['ids_equipo2'] = [equipos[partido_id][1] for partido_id in partidos['id']]
+    return partidos
+
+@medidor.funcion()
+def obtener_pagina_partidos(desde=None, hasta=None, jugador_id=None, limite=10, offset=0):
+    return leer_pagina_partidos(version_datos(), desde, hasta, jugador_id, limite, offset)
+
+@st.cache_data(max_entries=32)
+def leer_cantidad_partidos(version, desde, hasta, jugador_id):
+    return repositorio.contar_partidos(conn, desde, hasta, jugador_id)
+
+@medidor.funcion()
+def contar_partidos(desde=None, hasta=None, jugador_id=None):
+    return leer_cantidad_partidos(version_datos(), desde, hasta, jugador_id)
+
+@medidor.funcion()
+def borrar_partidos(partido_ids):
+    escritura.ejecutar(repositorio.borrar_partidos, partido_ids)
+
+@medidor.funcion()
 def borrar_partido(partido_id):
-    c.execute("DELETE FROM partidos WHERE id = ?", (partido_id,))
-    conn.commit()
+    borrar_partidos([partido_id])
+
+@medidor.funcion()
+def borrar_jugadores(jugador_ids):
+    escritura.ejecutar(repositorio.borrar_jugadores, jugador_ids)
+
+@medidor.funcion()
+def guardar_cambios_jugadores(original, editado):
+    cambios = escritura.ejecutar(repositorio.guardar_cambios_jugadores, original, editado)
+    return cambios
 
-def borrar_jugador(jugador_id):
-    c.execute("DELETE FROM jugadores WHERE id = ?", (jugador_id,))
-    conn.commit()
+def leer_archivo_importacion(archivo):
+    return repositorio.leer_archivo_importacion(archivo)
+
+@medidor.funcion()
+def importar_jugadores(df):
+    cantidad = escritura.ejecutar(repositorio.importar_jugadores, df)
+    return cantidad
+
+@medidor.funcion()
+def importar_partidos(df):
+    cantidad = escritura.ejecutar(repositorio.importar_partidos, df)
+    return cantidad
+
+@medidor.funcion()
+def recalcular_estadisticas():
+    escritura.ejecutar(calculo_estadisticas.reconstruir_estadisticas)
+    escritura.ejecutar(calculo_estadisticas.reconstruir_ratings)
+
+# Estilos de la tabla de posiciones: columnas de CSS calculadas de una vez con NumPy
+def degradado_css(valores, tema_oscuro):
+    # Degradado de rojo (mínimo) a verde (máximo); los límites se calculan una sola vez por columna
+    valores = np.asarray(valores, dtype=np.float64)
+    minimo, maximo = np.nanmin(valores), np.nanmax(valores)
+    if minimo == maximo:
+        rojo = verde = np.zeros(len(valores), dtype=np.int64)
+    else:
+        rojo = (np.maximum((maximo - valores) / (maximo - minimo), 0) * 255).astype(np.int64)
+        verde = (np.maximum((valores - minimo) / (maximo - minimo), 0) * 255).astype(np.int64)
+    opacidad, texto = ('0.7', 'white') if tema_oscuro else ('0.3', 'black')
+    estilos = np.array([f'background-color: rgba({r}, {g}, 0, {opacidad}); color: {texto};' for r, g in zip(rojo, verde)], dtype=object)
+    estilos[np.isnan(valores)] = ''
+    return estilos
+
+def racha_css(rachas, tema_oscuro):
+    # Rachas en curso resaltadas (dorado desde 7 partidos); el resto con el degradado de la columna
+    rachas = np.asarray(rachas, dtype=np.float64)
+    return np.where(rachas >= 7, 'background-color: gold; color: black;',
+                    np.where(rachas > 0, 'background-color: lightgreen; color: black;', degradado_css(rachas, tema_oscuro)))
+
+@st.cache_data(max_entries=8)
+def leer_tabla_posiciones(version, tema_oscuro):
+    # Tabla ordenada y estilos por celda, memorizados por versión de datos y tema
+    estadisticas = leer_estadisticas_jugadores(version)
+    estadisticas = estadisticas.sort_values(by=['porcentaje_victorias', 'victorias', 'partidos_jugados'], ascending=[False, False, False])
+    estadisticas['posicion'] = range(1, len(estadisticas) + 1)
+    estadisticas = estadisticas[['posicion', 'nombre', 'partidos_jugados', 'victorias', 'porcentaje_victorias', 'racha_ganadora', 'racha_maxima', 'rating']]
+    estilos = {
+        'porcentaje_victorias': degradado_css(estadisticas['porcentaje_victorias'], tema_oscuro),
+        'racha_ganadora': racha_css(estadisticas['racha_ganadora'], tema_oscuro),
+    }
+    return estadisticas, estilos
+
+@medidor.funcion()
+def obtener_tabla_posiciones(tema_oscuro):
+    return leer_tabla_posiciones(version_datos(), tema_oscuro)
+
+# Acumulados por jugador y fecha: una sola lectura por versión de datos para todas las ventanas
+@st.cache_data(max_entries=4)
+def leer_historial(version):
+    return historial.cargar_historial(conn)
+
+@medidor.funcion()
+def obtener_historial():
+    return leer_historial(version_datos())
 
-def actualizar_jugador(jugador_id, nombre, posicion):
-    c.execute("UPDATE jugadores SET nombre = ?, posicion = ? WHERE id = ?", (nombre, posicion, jugador_id))
-    conn.commit()
 
 def get_table_style():
     return [
@@ -231,9 +308,12 @@ def get_table_style():
 # Interfaz de Streamlit
 st.title('Picadito App ⚽')
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Jugadores 👤", "Generar Equipos 👥", "Registrar Partido 📝", "Posiciones 🥇", "Historial de Partidos 🏟️"])
+pestanas = ["Jugadores 👤", "Generar Equipos 👥", "Registrar Partido 📝", "Posiciones 🥇", "Historial de Partidos 🏟️"]
+if modo_diagnostico:
+    pestanas.append("Rendimiento 🛠️")
+tab1, tab2, tab3, tab4, tab5, *tab_rendimiento = st.tabs(pestanas)
 
-with tab1:
+with tab1, medidor.medir("Jugadores", tipo='pestaña'):
     st.header("Registro de Jugadores 👤")
     
     # Formulario para agregar nuevo jugador
@@ -258,6 +338,7 @@ with tab1:
     edited_df = st.data_editor(
         jugadores_edit,
         hide_index=True,
+        num_rows="dynamic",
         column_config={
             "id": None,  # Ocultar la columna ID
             "nombre": "Nombre",
@@ -272,13 +353,13 @@ with tab1:
     
     # Procesar las ediciones y eliminaciones
     if st.button("Guardar Cambios"):
-        for index, row in edited_df.iterrows():
-            original_row = jugadores.loc[jugadores['id'] == row['id']].iloc[0]
-            if row['nombre'] != original_row['nombre'] or row['posicion'] != original_row['posicion']:
-                actualizar_jugador(row['id'], row['nombre'], row['posicion'])
-                st.success(f"Jugador {row['nombre']} actualizado.")
-        
-        st.rerun()  # Recargar la app para mostrar los cambios
+        cambios = guardar_cambios_jugadores(jugadores, edited_df)
+        st.success(f"{cambios['actualizados']} actualizados, {cambios['agregados']} agregados, {cambios['borrados']} borrados.")
+        if cambios['sin_nombre']:
+            # Sin recargar, para que el aviso quede visible junto a la tabla
+            st.warning(f"{cambios['sin_nombre']} filas con el nombre vacío no se guardaron.")
+        else:
+            st.rerun()  # Recargar la app para mostrar los cambios
     
     # Opción para borrar jugadores
     st.subheader("Borrar Jugadores")
@@ -286,17 +367,23 @@ with tab1:
     jugadores_a_borrar = st.multiselect("Selecciona jugadores para borrar", jugadores['nombre'].tolist())
     if st.button("Borrar Jugadores Seleccionados"):
         if jugadores_a_borrar:
-            for nombre in jugadores_a_borrar:
-                jugador_id = jugadores[jugadores['nombre'] == nombre]['id'].iloc[0]
-                borrar_jugador(jugador_id)
-                st.success(f"Jugador {nombre} eliminado.")
+            borrar_jugadores(obtener_directorio().ids_de(jugadores_a_borrar).tolist())
+            st.success(f"Jugadores eliminados: {', '.join(jugadores_a_borrar)}")
             
             # Actualizar la lista de jugadores después de borrar
             st.rerun()  # Recargar la app para mostrar los cambios
         else:
             st.warning("No se seleccionaron jugadores para borrar.")
+    
+    # Importación masiva de jugadores
+    with st.expander("Importar jugadores (CSV/JSON)"):
+        st.caption("Columnas: nombre, posicion")
+        archivo_jugadores = st.file_uploader("Archivo de jugadores", type=["csv", "json"], key="importar_jugadores")
+        if archivo_jugadores is not None and st.button("Importar Jugadores"):
+            cantidad = importar_jugadores(leer_archivo_importacion(archivo_jugadores))
+            st.success(f"{cantidad} jugadores importados.")
 
-with tab2:
+with tab2, medidor.medir("Generar Equipos", tipo='pestaña'):
     st.header("Generar Equipos 👥")
     fecha_generacion = st.date_input("Fecha del partido", key="fecha_generacion")
     jugadores = obtener_jugadores()['nombre'].tolist()
@@ -306,8 +393,15 @@ with tab2:
     num_jugadores_seleccionados = len(jugadores_disponibles)
     st.write(f"Jugadores seleccionados: {num_jugadores_seleccionados}")
     
+    # Las jornadas rotativas se juegan con más de dos equipos y un fixture de todos contra todos
+    cantidad_equipos = st.number_input("Cantidad de equipos", 
+                                       min_value=2, 
+                                       max_value=6, 
+                                       value=2,
+                                       help="Con más de dos equipos se equilibran las victorias o el rating y las posiciones.")
+    
     # Calculate max_value based on the number of available players
-    max_jugadores_por_equipo = num_jugadores_seleccionados // 2
+    max_jugadores_por_equipo = num_jugadores_seleccionados // cantidad_equipos
     
     # Only show the options if there are enough players selected
     if max_jugadores_por_equipo >= 1:
@@ -335,6 +429,37 @@ with tab2:
                                           max_value=2.0, 
                                           value=1.0, 
                                           step=0.1)
+        objetivo = st.radio("Equilibrar por", ["Victorias", "Rating"], horizontal=True,
+                            help="Rating: puntaje Elo que considera la diferencia de goles y la fuerza del rival.")
+        objetivo = objetivo.lower()
+        etiqueta_objetivo = "Victorias" if objetivo == 'victorias' else "Rating"
+        etiqueta_total = "Victorias totales" if objetivo == 'victorias' else "Rating total"
+        
+        # Criterios adicionales: con alguno activo se minimiza un puntaje que los combina
+        with st.expander("Más criterios de balanceo"):
+            ponderacion_goles = st.slider("Ponderación de diferencia de goles", 
+                                          min_value=0.0, 
+                                          max_value=2.0, 
+                                          value=0.0, 
+                                          step=0.1,
+                                          help="Iguala la diferencia de goles acumulada por los jugadores de cada equipo.")
+            ponderacion_posiciones = st.slider("Ponderación de reparto de posiciones", 
+                                               min_value=0.0, 
+                                               max_value=2.0, 
+                                               value=0.0, 
+                                               step=0.1,
+                                               help="Iguala la cantidad de defensores, mediocampistas, delanteros y arqueros de cada equipo.")
+            un_arquero_por_equipo = st.checkbox("Un arquero por equipo",
+                                                help="Con dos o más arqueros convocados, cada equipo lleva al menos uno.")
+            tiempo_limite = st.number_input("Tiempo máximo de búsqueda (segundos)", 
+                                            min_value=1, 
+                                            max_value=60, 
+                                            value=5,
+                                            help=f"Sólo con criterios adicionales y más de {LIMITE_EVALUACION_COMPLETA} jugadores, "
+                                                 f"o con más de {LIMITE_BUSQUEDA_EXACTA} jugadores.")
+        criterios = dict(ponderacion_goles=ponderacion_goles, ponderacion_posiciones=ponderacion_posiciones,
+                         un_arquero_por_equipo=un_arquero_por_equipo, tiempo_limite=tiempo_limite)
+        multiobjetivo = bool(ponderacion_goles or ponderacion_posiciones or un_arquero_por_equipo)
 
         st.markdown("""
         <p style='color: gray; font-style: italic; font-size: 0.9em;'>
@@ -346,54 +471,174 @@ with tab2:
         </p>
         """, unsafe_allow_html=True)
 
-        if st.button("Generar Equipos"):
-            if len(jugadores_disponibles) < jugadores_por_equipo * 2:
-                st.error("No hay suficientes jugadores disponibles para formar dos equipos.")
-            else:
-                with st.spinner('Generando equipos...'):
-                    resultado = generar_equipos_con_progreso(jugadores_disponibles, jugadores_por_equipo, max_defensores, min_mediocampistas, min_delanteros, ponderacion_victorias)
-                if resultado is not None:
+        if cantidad_equipos > 2:
+            # Más de dos equipos: el reparto es rápido y corre en el momento; se guarda como jornada con su fixture
+            solicitud = (tuple(jugadores_disponibles), cantidad_equipos, jugadores_por_equipo, max_defensores,
+                         min_mediocampistas, min_delanteros, objetivo, str(fecha_generacion))
+            if st.button("Generar Equipos"):
+                if len(jugadores_disponibles) != jugadores_por_equipo * cantidad_equipos:
+                    st.error(f"Para {cantidad_equipos} equipos de {jugadores_por_equipo} selecciona exactamente "
+                             f"{jugadores_por_equipo * cantidad_equipos} jugadores.")
+                else:
+                    resultado = armado_equipos.generar_equipos_jornada(conn, jugadores_disponibles, cantidad_equipos,
+                                                                       jugadores_por_equipo, max_defensores,
+                                                                       min_mediocampistas, min_delanteros, objetivo)
+                    st.session_state['jornada'] = {'solicitud': solicitud, 'resultado': resultado, 'guardada': False}
+            
+            jornada = st.session_state.get('jornada')
+            if jornada is not None and jornada['solicitud'] == solicitud:
+                if jornada['resultado'] is None:
+                    st.error("No se pudo generar equipos que cumplan con todas las restricciones. Intenta con diferentes parámetros o jugadores.")
+                else:
+                    equipos, sumas, diferencia = jornada['resultado']
+                    directorio = obtener_directorio()
+                    for numero, (col, equipo, suma) in enumerate(zip(st.columns(cantidad_equipos), equipos, sumas), start=1):
+                        with col:
+                            st.subheader(f"Equipo {numero}")
+                            st.table(directorio.tabla(directorio.ids_de(equipo)))
+                            st.write(f"{etiqueta_total}: {suma:.0f}")
+                    st.write(f"Diferencia de {etiqueta_objetivo.lower()} entre el equipo más fuerte y el más débil: {diferencia:.0f}")
+                    
+                    if not jornada['guardada']:
+                        guardar_jornada(fecha_generacion, equipos)
+                        jornada['guardada'] = True
+                    st.success(f"Jornada de {cantidad_equipos} equipos guardada para la fecha {fecha_generacion}. "
+                               "El fixture está en Registrar Partido.")
+        else:
+            # La generación corre en otro hilo; su estado queda en la sesión entre reruns
+            solicitud = (tuple(jugadores_disponibles), jugadores_por_equipo, max_defensores, min_mediocampistas,
+                         min_delanteros, ponderacion_victorias, objetivo, tuple(sorted(criterios.items())),
+                         str(fecha_generacion))
+            if st.button("Generar Equipos"):
+                if len(jugadores_disponibles) < jugadores_por_equipo * 2:
+                    st.error("No hay suficientes jugadores disponibles para formar dos equipos.")
+                else:
+                    tarea, soltar, huella = iniciar_generacion(jugadores_disponibles, jugadores_por_equipo, max_defensores, min_mediocampistas, min_delanteros, ponderacion_victorias, objetivo, **criterios)
+                    # La generación anterior de esta sesión deja de seguirse
+                    anterior = st.session_state.get('generacion')
+                    if anterior is not None:
+                        anterior['soltar']()
+                    # Los planteles chicos terminan enseguida: se espera un instante antes de mostrar el progreso
+                    tarea.esperar(0.25)
+                    st.session_state['generacion'] = {'solicitud': solicitud, 'tarea': tarea, 'soltar': soltar, 'huella': huella,
+                                                      'aceptada': None, 'guardada': None, 'alternativa': 0}
+        
+            # Si cambiaron los jugadores o los parámetros, el resultado anterior ya no aplica
+            generacion = st.session_state.get('generacion')
+            if generacion is not None and generacion['solicitud'] != solicitud:
+                generacion = None
+        
+            if generacion is not None and not generacion['tarea'].terminada and generacion['aceptada'] is None:
+                mostrar_generacion_en_curso()
+            elif generacion is not None:
+                tarea = generacion['tarea']
+                # Lo aceptado antes de terminar es la mejor división de ese momento; la tarea puede seguir para otras sesiones
+                aceptada = generacion['aceptada']
+                resultado = aceptada or tarea.mejor
+                completa = tarea.completa and aceptada is None
+                alternativas = tarea.alternativas if aceptada is None else None
+                # "Siguiente alternativa" recorre las alternativas ya calculadas, sin volver a buscar
+                if generacion['alternativa'] and alternativas:
+                    alt_equipo1, alt_equipo2, alt_victorias1, alt_victorias2, alt_diferencia = alternativas[generacion['alternativa']]
+                    resultado = ((alt_equipo1, alt_equipo2), alt_victorias1, alt_victorias2, alt_diferencia)
+                if aceptada is None and tarea.error is not None:
+                    st.error(f"Error al generar equipos: {tarea.error}")
+                elif resultado is not None:
                     equipos, victorias_equipo1, victorias_equipo2, diferencia_ponderada = resultado
                     equipo1, equipo2 = equipos
+                
+                    if not completa:
+                        st.info("Búsqueda detenida: se muestra la mejor división encontrada hasta el momento.")
+                    elif not tarea.persistida:
+                        guardar_resultado_generacion(generacion['huella'], tarea)
                     
+                    if alternativas and len(alternativas) > 1:
+                        st.caption(f"Alternativa {generacion['alternativa'] + 1} de {len(alternativas)}")
+                        if st.button("Siguiente alternativa"):
+                            generacion['alternativa'] = (generacion['alternativa'] + 1) % len(alternativas)
+                            st.rerun()
+                
                     # Crear DataFrames para cada equipo
-                    df_equipo1 = obtener_jugadores()[obtener_jugadores()['nombre'].isin(equipo1)][['nombre', 'posicion']]
-                    df_equipo2 = obtener_jugadores()[obtener_jugadores()['nombre'].isin(equipo2)][['nombre', 'posicion']]
-                    
+                    directorio = obtener_directorio()
+                    df_equipo1 = directorio.tabla(directorio.ids_de(equipo1))
+                    df_equipo2 = directorio.tabla(directorio.ids_de(equipo2))
+                
                     # Mostrar los equipos en dos columnas
                     col1, col2 = st.columns(2)
                     with col1:
                         st.subheader("Equipo 1")
                         st.table(df_equipo1)
-                        st.write(f"Victorias totales: {victorias_equipo1}")
+                        st.write(f"{etiqueta_total}: {victorias_equipo1:.0f}")
                     with col2:
                         st.subheader("Equipo 2")
                         st.table(df_equipo2)
-                        st.write(f"Victorias totales: {victorias_equipo2}")
-                    
-                    st.write(f"Diferencia de victorias (ponderada): {diferencia_ponderada:.2f}")
-                    st.write(f"Diferencia de victorias (sin ponderar): {abs(victorias_equipo1 - victorias_equipo2)}")
-                    
-                    # Guardar los equipos generados
-                    guardar_equipos_generados(fecha_generacion, equipo1, equipo2)
+                        st.write(f"{etiqueta_total}: {victorias_equipo2:.0f}")
+                
+                    if multiobjetivo:
+                        st.write(f"Puntaje combinado (menor es más parejo): {diferencia_ponderada:.2f}")
+                    else:
+                        st.write(f"Diferencia de {etiqueta_objetivo.lower()} (ponderada): {diferencia_ponderada:.2f}")
+                    st.write(f"Diferencia de {etiqueta_objetivo.lower()} (sin ponderar): {abs(victorias_equipo1 - victorias_equipo2):.0f}")
+                
+                    if alternativas:
+                        with st.expander("Alternativas más parejas"):
+                            st.dataframe(pd.DataFrame(
+                                [(", ".join(alt_equipo1), ", ".join(alt_equipo2), alt_victorias1, alt_victorias2, alt_diferencia)
+                                 for alt_equipo1, alt_equipo2, alt_victorias1, alt_victorias2, alt_diferencia in alternativas],
+                                columns=["Equipo 1", "Equipo 2", f"{etiqueta_objetivo} 1", f"{etiqueta_objetivo} 2", "Puntaje" if multiobjetivo else "Diferencia ponderada"]
+                            ), hide_index=True)
+                
+                    # Guardar los equipos generados una sola vez por generación
+                    if generacion['guardada'] != generacion['alternativa']:
+                        guardar_equipos_generados(fecha_generacion, equipo1, equipo2)
+                        generacion['guardada'] = generacion['alternativa']
                     st.success(f"Equipos generados y guardados para la fecha {fecha_generacion}")
                 else:
                     st.error("No se pudo generar equipos que cumplan con todas las restricciones. Intenta con diferentes parámetros o jugadores.")
     else:
         st.warning("Selecciona al menos dos jugadores para generar equipos.")
 
-with tab3:
+with tab3, medidor.medir("Registrar Partido", tipo='pestaña'):
     st.header("Registrar Partido 📝")
     fecha = st.date_input("Fecha del partido", key="fecha_registro")
     
-    # Obtener equipos generados para la fecha seleccionada
-    equipos_generados = obtener_equipos_generados()
-    equipos_fecha = equipos_generados[equipos_generados['fecha'] == str(fecha)]
+    # Jornada de más de dos equipos: cada cruce del fixture se registra como un partido
+    jornada = obtener_jornada(fecha)
+    if jornada is not None:
+        st.subheader(f"Jornada de {len(jornada['equipos'])} equipos")
+        for col, (numero, nombres) in zip(st.columns(len(jornada['equipos'])), jornada['equipos'].items()):
+            col.markdown(f"**Equipo {numero}**")
+            col.write(", ".join(nombres))
+        
+        fixture = jornada['fixture']
+        st.dataframe(pd.DataFrame({
+            "Ronda": fixture['ronda'],
+            "Cruce": "Equipo " + fixture['equipo_local'].astype(str) + " vs Equipo " + fixture['equipo_visitante'].astype(str),
+            "Resultado": [f"{int(local)} - {int(visitante)}" if pd.notna(partido) else "Pendiente"
+                          for partido, local, visitante in zip(fixture['partido_id'], fixture['goles_local'], fixture['goles_visitante'])],
+        }), hide_index=True)
+        
+        pendientes = fixture[fixture['partido_id'].isna()]
+        if not pendientes.empty:
+            with st.form("resultado_jornada"):
+                cruce_id = st.selectbox("Cruce", pendientes['id'].tolist(),
+                                        format_func=lambda cruce: "Ronda {} - Equipo {} vs Equipo {}".format(
+                                            *pendientes.loc[pendientes['id'] == cruce, ['ronda', 'equipo_local', 'equipo_visitante']].iloc[0]))
+                goles_local = st.number_input("Goles local", min_value=0, step=1)
+                goles_visitante = st.number_input("Goles visitante", min_value=0, step=1)
+                if st.form_submit_button("Registrar resultado"):
+                    registrar_partido_jornada(cruce_id, goles_local, goles_visitante)
+                    st.success("Resultado registrado")
+                    st.rerun()
+        st.divider()
+    
+    # Obtener equipos generados para la fecha seleccionada; se nombran con los nombres actuales
+    equipos_fecha = obtener_equipos_generados_fecha(fecha)
     
-    if not equipos_fecha.empty:
+    if equipos_fecha is not None:
         st.write("Equipos generados para esta fecha:")
-        equipo1 = equipos_fecha.iloc[0]['equipo1'].split(',')
-        equipo2 = equipos_fecha.iloc[0]['equipo2'].split(',')
+        directorio = obtener_directorio()
+        equipo1, equipo2 = (directorio.nombres_de(ids) for ids in equipos_fecha)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -419,8 +664,16 @@ with tab3:
     if st.button("Registrar Partido"):
         registrar_partido(fecha, equipo1, equipo2, goles1, goles2)
         st.success("Partido registrado exitosamente")
+    
+    # Importación masiva de partidos históricos
+    with st.expander("Importar partidos históricos (CSV/JSON)"):
+        st.caption("Columnas: fecha, equipo1, equipo2, goles1, goles2. Los equipos van como nombres separados por comas.")
+        archivo_partidos = st.file_uploader("Archivo de partidos", type=["csv", "json"], key="importar_partidos")
+        if archivo_partidos is not None and st.button("Importar Partidos"):
+            cantidad = importar_partidos(leer_archivo_importacion(archivo_partidos))
+            st.success(f"{cantidad} partidos importados.")
 
-with tab4:
+with tab4, medidor.medir("Posiciones", tipo='pestaña'):
     st.header("Tabla de Posiciones 🥇")
     
     estadisticas = obtener_estadisticas_jugadores()
@@ -433,50 +686,22 @@ with tab4:
         with col1:
             # Tabla de posiciones
             st.subheader("Tabla General")
-            estadisticas = estadisticas.sort_values(by=['porcentaje_victorias', 'victorias', 'partidos_jugados'], ascending=[False, False, False])
-            estadisticas['posicion'] = range(1, len(estadisticas) + 1)
-            estadisticas = estadisticas[['posicion', 'nombre', 'partidos_jugados', 'victorias', 'porcentaje_victorias', 'racha_ganadora']]
             
             # Detectar el tema actual
             is_dark_theme = st.get_option("theme.base") == "dark"
             
-            # Función para aplicar el degradado de colores
-            def color_scale(val, column):
-                if pd.isna(val):
-                    return ''
-                if column == 'racha_ganadora':
-                    if val >= 7:
-                        return 'background-color: gold; color: black;'
-                    elif val > 0:
-                        return 'background-color: lightgreen; color: black;'
-                
-                min_val = estadisticas[column].min()
-                max_val = estadisticas[column].max()
-                
-                if min_val == max_val:
-                    r, g = 0, 0
-                else:
-                    # Crear un degradado de rojo (bajo) a verde (alto)
-                    r = max((max_val - val) / (max_val - min_val), 0)
-                    g = max((val - min_val) / (max_val - min_val), 0)
-                b = 0
-                
-                # Ajustar la opacidad y el color del texto según el tema
-                if is_dark_theme:
-                    return f'background-color: rgba({int(r*255)}, {int(g*255)}, {int(b*255)}, 0.7); color: white;'
-                else:
-                    return f'background-color: rgba({int(r*255)}, {int(g*255)}, {int(b*255)}, 0.3); color: black;'
-            
-            # Aplicar estilos a la tabla
+            # Orden y colores salen de la caché; acá sólo se arma el Styler con columnas ya calculadas
+            estadisticas, estilos = obtener_tabla_posiciones(is_dark_theme)
             styled_table = (estadisticas.style
-                .applymap(lambda x: color_scale(x, 'porcentaje_victorias'), subset=['porcentaje_victorias'])
-                .applymap(lambda x: color_scale(x, 'racha_ganadora'), subset=['racha_ganadora'])
+                .apply(lambda columna: estilos[columna.name], axis=0, subset=list(estilos))
                 .format({
                     'posicion': '{:.0f}',
                     'porcentaje_victorias': '{:.2f}%',
                     'victorias': '{:.0f}',
                     'partidos_jugados': '{:.0f}',
-                    'racha_ganadora': '{:.0f}'
+                    'racha_ganadora': '{:.0f}',
+                    'racha_maxima': '{:.0f}',
+                    'rating': '{:.0f}'
                 })
                 .set_properties(**{
                     'font-weight': 'bold',
@@ -500,33 +725,151 @@ with tab4:
             rachas = estadisticas[estadisticas['racha_ganadora'] > 0].sort_values(by='racha_ganadora', ascending=False).head(5)
             for _, jugador in rachas.iterrows():
                 trofeo = "🏆" if jugador['racha_ganadora'] >= 7 else ""
-                st.write(f"{jugador['nombre']}: {jugador['racha_ganadora']} partidos {trofeo}")
+                st.write(f"{jugador['nombre']}: {jugador['racha_ganadora']} partidos {trofeo} (récord: {jugador['racha_maxima']})")
+        
+        # Posiciones a una fecha y en ventanas móviles, a partir de los acumulados
+        st.subheader("Historial y forma 📈")
+        acumulados = obtener_historial()
+        col1, col2 = st.columns(2)
+        with col1:
+            fecha_corte = st.date_input("Posiciones al día", key="posiciones_fecha")
+        with col2:
+            ventana = st.radio("Ventana", ["Todo el historial", "Últimos 10 partidos", "Últimos 90 días"], horizontal=True, key="posiciones_ventana")
+        tabla_ventana = acumulados.tabla(hasta=fecha_corte,
+                                         dias=90 if ventana == "Últimos 90 días" else None,
+                                         ultimos=10 if ventana == "Últimos 10 partidos" else None)
+        if tabla_ventana.empty:
+            st.write("No hay partidos en ese período.")
+        else:
+            tabla_ventana.insert(0, 'posicion', range(1, len(tabla_ventana) + 1))
+            st.dataframe(tabla_ventana.drop(columns='jugador_id'), hide_index=True, height=300,
+                         column_config={'porcentaje_victorias': st.column_config.NumberColumn(format="%.2f%%")})
+        
+        # Forma de un jugador: porcentaje acumulado y de los últimos 10 partidos
+        jugadores_forma = dict(zip(acumulados.nombres, acumulados.jugador_ids.tolist()))
+        if jugadores_forma:
+            jugador_forma = st.selectbox("Forma del jugador", sorted(jugadores_forma), key="forma_jugador")
+            forma = acumulados.forma(jugadores_forma[jugador_forma])
+            forma = forma.rename(columns={'porcentaje_victorias': 'Acumulado', 'porcentaje_ultimos_10': 'Últimos 10'})
+            grafico = alt.Chart(forma).transform_fold(['Acumulado', 'Últimos 10'], as_=['serie', 'porcentaje']).mark_line(point=True).encode(
+                x=alt.X('fecha:T', title='Fecha'),
+                y=alt.Y('porcentaje:Q', title='% de victorias', scale=alt.Scale(domain=[0, 100])),
+                color=alt.Color('serie:N', title=None),
+                tooltip=['fecha:T', 'partido:Q', 'serie:N', 'porcentaje:Q', 'diferencia_goles:Q'],
+            )
+            st.altair_chart(grafico, width='stretch')
+    
+    if st.button("Recalcular estadísticas"):
+        recalcular_estadisticas()
+        st.success("Estadísticas y ratings recalculados desde el historial de partidos.")
+        st.rerun()
 
-with tab5:
+with tab5, medidor.medir("Historial de Partidos", tipo='pestaña'):
     st.header("Historial de Partidos 🏟️")
     
-    partidos = obtener_partidos()
+    # Filtros: se resuelven en SQL y sólo se trae la página visible
+    col1, col2, col3 = st.columns([4, 4, 2])
+    with col1:
+        rango_fechas = st.date_input("Rango de fechas", value=[], key="historial_fechas")
+    with col2:
+        jugadores_historial = obtener_jugadores()
+        jugador_historial = st.selectbox("Jugador", ["Todos"] + jugadores_historial['nombre'].tolist(), key="historial_jugador")
+    with col3:
+        partidos_por_pagina = st.selectbox("Por página", [10, 25, 50], key="historial_por_pagina")
+    
+    desde, hasta = (rango_fechas[0], rango_fechas[1]) if len(rango_fechas) == 2 else (None, None)
+    jugador_id = None
+    if jugador_historial != "Todos":
+        jugador_id = obtener_directorio().id_de(jugador_historial)
     
-    if not partidos.empty:
+    total_partidos = contar_partidos(desde, hasta, jugador_id)
+    
+    if total_partidos > 0:
+        total_paginas = (total_partidos + partidos_por_pagina - 1) // partidos_por_pagina
+        pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, key="historial_pagina")
+        partidos = obtener_pagina_partidos(desde, hasta, jugador_id, partidos_por_pagina, (pagina - 1) * partidos_por_pagina)
+        st.caption(f"{total_partidos} partidos encontrados")
+        
+        directorio = obtener_directorio()
         for _, partido in partidos.iterrows():
-            with st.expander(f"Partido del {partido['fecha']} - {partido['equipo1'].split(',')[0]} vs {partido['equipo2'].split(',')[0]}"):
+            # Nombres actuales a partir de los ids; el texto guardado si al equipo le faltan participantes
+            # registrados (partidos anteriores a los ids o con jugadores que ya se borraron)
+            equipo1, equipo2 = [
+                directorio.nombres_de(ids) if len(ids) >= len(texto) else texto
+                for ids, texto in ((partido['ids_equipo1'], [nombre for nombre in (partido['equipo1'] or '').split(',') if nombre]),
+                                   (partido['ids_equipo2'], [nombre for nombre in (partido['equipo2'] or '').split(',') if nombre]))
+            ]
+            with st.expander(f"Partido del {partido['fecha']} - {(equipo1 or [''])[0]} vs {(equipo2 or [''])[0]}"):
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     st.write("**Equipo 1:**")
-                    st.write(", ".join(partido['equipo1'].split(',')))
+                    st.write(", ".join(equipo1))
                 with col2:
                     st.write("**Resultado:**")
                     st.write(f"{partido['goles1']} - {partido['goles2']}")
                 with col3:
                     st.write("**Equipo 2:**")
-                    st.write(", ".join(partido['equipo2'].split(',')))
+                    st.write(", ".join(equipo2))
                 
                 if st.button("Borrar Partido", key=f"borrar_{partido['id']}"):
                     borrar_partido(partido['id'])
-                    st.success("Partido borrado exitosamente. Recarga la página para ver los cambios.")
+                    st.success("Partido borrado exitosamente.")
+                    st.rerun()
+        
+        # Borrado en bloque de partidos de la página visible
+        etiquetas = {int(partido['id']): f"{partido['fecha']} - {partido['goles1']} a {partido['goles2']} (#{partido['id']})"
+                     for _, partido in partidos.iterrows()}
+        partidos_a_borrar = st.multiselect("Selecciona partidos para borrar", list(etiquetas), format_func=etiquetas.get, key="historial_borrar")
+        if st.button("Borrar Partidos Seleccionados"):
+            if partidos_a_borrar:
+                borrar_partidos(partidos_a_borrar)
+                st.success(f"{len(partidos_a_borrar)} partidos borrados.")
+                st.rerun()
+            else:
+                st.warning("No se seleccionaron partidos para borrar.")
     else:
         st.write("No hay partidos registrados.")
 
-# Cerrar conexión
-conn.close()
+# Panel de rendimiento: sólo con ?debug=1
+if tab_rendimiento:
+    with tab_rendimiento[0]:
+        st.header("Rendimiento 🛠️")
+        st.caption("Pasos: miles de instrucciones de SQLite, proporcionales a las filas recorridas.")
+        registros = medicion.resumen()
+        reruns = registros[registros['tipo'] == 'rerun']
+        if reruns.empty:
+            st.write("Todavía no hay reruns medidos: interactúa con la app y vuelve a esta pestaña.")
+        else:
+            st.subheader("Últimos reruns")
+            st.dataframe(reruns[['rerun', 'segundos', 'consultas', 'pasos']].head(20), hide_index=True)
+            
+            # Desglose del último rerun terminado por pestaña y por función
+            ultimo = reruns['rerun'].iloc[0]
+            detalle = (registros[(registros['rerun'] == ultimo) & (registros['tipo'] != 'rerun')]
+                       .groupby(['tipo', 'nombre'], as_index=False)
+                       .agg(llamadas=('segundos', 'size'), segundos=('segundos', 'sum'),
+                            consultas=('consultas', 'sum'), pasos=('pasos', 'sum'))
+                       .sort_values('segundos', ascending=False))
+            st.subheader(f"Rerun {ultimo}")
+            st.dataframe(detalle, hide_index=True)
+        
+        if medicion.sentencias:
+            st.subheader("Sentencias más ejecutadas")
+            st.dataframe(pd.DataFrame(medicion.sentencias.most_common(15), columns=['sentencia', 'ejecuciones']), hide_index=True)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("Exportar JSON lines", medicion.exportar_jsonl(), file_name="metricas.jsonl", mime="application/x-ndjson")
+        with col2:
+            if st.button("Perfilar la próxima acción", help="Corre el próximo rerun bajo cProfile."):
+                medicion.perfilar_proximo = True
+        with col3:
+            if st.button("Reiniciar mediciones"):
+                medicion.reiniciar()
+                st.rerun()
+        
+        if medicion.perfil is not None:
+            with st.expander(f"Perfil del rerun {medicion.perfil['rerun']}"):
+                st.code(medicion.perfil['texto'])
 
+medidor.finalizar_rerun()
@@ -0,0 +1,149 @@
+"""Benchmark de generación de equipos y consultas de estadísticas.
+
+Genera bases ``picadito.db`` sintéticas con la cantidad de jugadores y de
+partidos indicada y mide, para cada una, la latencia (mediana y mínimo) y la
+memoria pico de:
+
+* carga: apertura de la base, creación del esquema y migraciones
+* generar_equipos: ``equipos.generar_equipos`` con el plantel completo
+* posiciones: ``estadisticas.obtener_estadisticas_jugadores``
+* victorias_jugador: ``estadisticas.obtener_victorias_jugador`` para todos los jugadores
+* historial: primera página del historial y su conteo
+* registrar_partido: alta de un partido con sus estadísticas y ratings, posterior a todo el historial
+* registrar_partido_atrasado: lo mismo con un partido fechado al principio del historial
+* borrar_ultimo_partido: baja del partido más reciente, con sus estadísticas y ratings
+
+Usa directamente el paquete ``picadito``, sin Streamlit ni caché de lecturas:
+
+    python benchmark.py --jugadores 10 20 30 --partidos 100 1000 10000
+    python benchmark.py --jugadores 40 --partidos 100000 --json resultados.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from picadito import equipos, estadisticas, repositorio
+
+POSICIONES = ["Delantero", "Mediocampista", "Defensor", "Arquero"]
+
+
+def generar_base(ruta, cantidad_jugadores, cantidad_partidos, semilla=0):
+    """Crea una base con el esquema original (jugadores y partidos con equipos como texto)."""
+    azar = random.Random(semilla)
+    conexion = sqlite3.connect(ruta)
+    conexion.execute("CREATE TABLE jugadores (id INTEGER PRIMARY KEY, nombre TEXT, posicion TEXT)")
+    conexion.execute("CREATE TABLE partidos (id INTEGER PRIMARY KEY, fecha TEXT, equipo1 TEXT, equipo2 TEXT, goles1 INTEGER, goles2 INTEGER)")
+    nombres = [f"Jugador {i}" for i in range(1, cantidad_jugadores + 1)]
+    conexion.executemany("INSERT INTO jugadores (nombre, posicion) VALUES (?, ?)",
+                         [(nombre, azar.choice(POSICIONES)) for nombre in nombres])
+
+    por_equipo = min(cantidad_jugadores // 2, 11)
+    inicio = datetime.date(2015, 1, 1)
+
+    def partidos():
+        for i in range(cantidad_partidos):
+            convocados = azar.sample(nombres, 2 * por_equipo)
+            fecha = inicio + datetime.timedelta(days=i // 3)
+            yield (fecha.isoformat(), ','.join(convocados[:por_equipo]), ','.join(convocados[por_equipo:]),
+                   azar.randint(0, 6), azar.randint(0, 6))
+
+    conexion.executemany("INSERT INTO partidos (fecha, equipo1, equipo2, goles1, goles2) VALUES (?, ?, ?, ?, ?)", partidos())
+    conexion.commit()
+    conexion.close()
+    return nombres
+
+
+def medir(funcion, repeticiones, antes=None):
+    """Devuelve (mediana_ms, minimo_ms, pico_kb) de ``funcion``; ``antes`` se llama antes de cada corrida."""
+    tiempos = []
+    for _ in range(repeticiones):
+        if antes is not None:
+            antes()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    # La memoria se mide en una corrida aparte: tracemalloc distorsiona los tiempos
+    if antes is not None:
+        antes()
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos), min(tiempos), pico / 1024
+
+
+def correr(cantidad_jugadores, cantidad_partidos, repeticiones):
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'picadito.db')
+        nombres = generar_base(ruta, cantidad_jugadores, cantidad_partidos)
+        resultados = {}
+
+        inicio = time.perf_counter()
+        conexion = repositorio.conectar(ruta)
+        resultados['carga'] = ((time.perf_counter() - inicio) * 1000,) * 2 + (None,)
+
+        por_equipo = cantidad_jugadores // 2
+        plantel = nombres[:2 * por_equipo]
+        resultados['generar_equipos'] = medir(
+            lambda: equipos.generar_equipos(conexion, plantel, por_equipo, por_equipo, 0, 0, 1.0), repeticiones)
+        resultados['posiciones'] = medir(
+            lambda: estadisticas.obtener_estadisticas_jugadores(conexion), repeticiones)
+        resultados['victorias_jugador'] = medir(
+            lambda: [estadisticas.obtener_victorias_jugador(conexion, nombre) for nombre in nombres], repeticiones)
+        resultados['historial'] = medir(
+            lambda: (repositorio.contar_partidos(conexion), repositorio.obtener_pagina_partidos(conexion, limite=25)),
+            repeticiones)
+        siguiente = (datetime.date.fromisoformat(conexion.execute("SELECT MAX(fecha) FROM partidos").fetchone()[0]) +
+                     datetime.timedelta(days=1)).isoformat()
+        resultados['registrar_partido'] = medir(
+            lambda: repositorio.registrar_partido(conexion, siguiente, plantel[:por_equipo], plantel[por_equipo:], 2, 1),
+            repeticiones)
+        resultados['registrar_partido_atrasado'] = medir(
+            lambda: repositorio.registrar_partido(conexion, '2015-01-01', plantel[:por_equipo], plantel[por_equipo:], 2, 1),
+            repeticiones)
+        ultimo = []
+        resultados['borrar_ultimo_partido'] = medir(
+            lambda: repositorio.borrar_partido(conexion, ultimo[-1]), repeticiones,
+            antes=lambda: ultimo.append(conexion.execute("SELECT id FROM partidos ORDER BY fecha DESC, id DESC LIMIT 1").fetchone()[0]))
+        conexion.close()
+
+    return [{'jugadores': cantidad_jugadores, 'partidos': cantidad_partidos, 'operacion': operacion,
+             'mediana_ms': round(mediana, 3), 'minimo_ms': round(minimo, 3),
+             'pico_kb': None if pico is None else round(pico, 1)}
+            for operacion, (mediana, minimo, pico) in resultados.items()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de Picadito App sobre ligas sintéticas")
+    parser.add_argument('--jugadores', type=int, nargs='+', default=[10, 20, 30],
+                        help="cantidades de jugadores a probar (10 a 40)")
+    parser.add_argument('--partidos', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="cantidades de partidos a probar (100 a 100000)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--json', help="archivo JSON lines donde agregar los resultados")
+    args = parser.parse_args(argv)
+
+    print(f"{'jugadores':>9} {'partidos':>8} {'operacion':<18} {'mediana_ms':>11} {'minimo_ms':>10} {'pico_kb':>10}")
+    for cantidad_jugadores in args.jugadores:
+        for cantidad_partidos in args.partidos:
+            filas = correr(cantidad_jugadores, cantidad_partidos, args.repeticiones)
+            for fila in filas:
+                pico = '-' if fila['pico_kb'] is None else f"{fila['pico_kb']:.1f}"
+                print(f"{fila['jugadores']:>9} {fila['partidos']:>8} {fila['operacion']:<18} "
+                      f"{fila['mediana_ms']:>11.2f} {fila['minimo_ms']:>10.2f} {pico:>10}")
+            if args.json:
+                with open(args.json, 'a') as archivo:
+                    for fila in filas:
+                        archivo.write(json.dumps(fila) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""Núcleo de Picadito App, sin dependencias de Streamlit.
+
+* ``repositorio``: conexión, esquema, migraciones y altas/bajas/consultas en SQLite
+* ``escritor``: cola única de escrituras, para varias sesiones o hilos a la vez
+* ``estadisticas``: tabla materializada de estadísticas, rachas y ratings Elo
+* ``directorio``: tabla de jugadores por id para resolver nombres y posiciones
+* ``historial``: posiciones a una fecha, ventanas móviles y forma con sumas acumuladas
+* ``equipos``: generación de equipos a partir de los datos de la base
+* ``metricas``: tiempos, consultas y perfiles de la app para diagnóstico
+* ``servicio``: operaciones en lote y servicio HTTP/JSON; ``python -m picadito`` es su línea de comandos
+* ``tareas``: generación de equipos en segundo plano, cancelable y reutilizable
+* ``balanceo``, ``busqueda_local``, ``particion``, ``rachas``, ``elo``: motores de cálculo puros
+
+Los submódulos se importan a pedido y NumPy/pandas se cargan recién cuando una
+función los necesita, así que ``import picadito.repositorio`` es inmediato y
+sirve para scripts, tareas programadas y benchmarks.
+"""
@@ -0,0 +1,92 @@
+"""Línea de comandos de Picadito, sobre ``picadito.servicio``.
+
+    python -m picadito generar Ana Beto Caro Dani --max-defensores 1
+    python -m picadito registrar --fecha 2024-05-10 --equipo1 Ana,Beto --equipo2 Caro,Dani --goles 3 2
+    python -m picadito posiciones --ultimos 10
+    python -m picadito lote solicitudes.json --trabajadores 8
+    python -m picadito servir --puerto 8765
+
+Todas las salidas son JSON. ``lote`` lee una lista de solicitudes (ver
+``picadito.servicio``) de un archivo, o de la entrada estándar con ``-``, y
+escribe un resultado por línea en el mismo orden.
+"""
+import argparse
+import json
+import sys
+
+from picadito import repositorio
+from picadito.servicio import TRABAJADORES, Servicio, servir
+
+
+def _imprimir(valor):
+    print(json.dumps(valor, ensure_ascii=False, default=lambda dato: dato.item()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m picadito', description="Picadito App sin interfaz gráfica")
+    parser.add_argument('--base', default=repositorio.RUTA_BASE, help="archivo SQLite (por defecto picadito.db)")
+    parser.add_argument('--trabajadores', type=int, default=TRABAJADORES, help="hilos para lotes y pedidos HTTP")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    generar = comandos.add_parser('generar', help="generar equipos para una lista de jugadores")
+    generar.add_argument('jugadores', nargs='+')
+    generar.add_argument('--equipos', type=int, default=2, dest='cantidad_equipos')
+    generar.add_argument('--por-equipo', type=int, dest='jugadores_por_equipo')
+    generar.add_argument('--max-defensores', type=int, dest='max_defensores')
+    generar.add_argument('--min-mediocampistas', type=int, default=0, dest='min_mediocampistas')
+    generar.add_argument('--min-delanteros', type=int, default=0, dest='min_delanteros')
+    generar.add_argument('--ponderacion', type=float, default=1.0, dest='ponderacion_victorias')
+    generar.add_argument('--objetivo', choices=['victorias', 'rating'], default='victorias')
+    generar.add_argument('--tiempo-limite', type=float, dest='tiempo_limite')
+
+    registrar = comandos.add_parser('registrar', help="registrar el resultado de un partido")
+    registrar.add_argument('--fecha', required=True)
+    registrar.add_argument('--equipo1', required=True, help="nombres separados por comas")
+    registrar.add_argument('--equipo2', required=True, help="nombres separados por comas")
+    registrar.add_argument('--goles', type=int, nargs=2, required=True, metavar=('GOLES1', 'GOLES2'))
+
+    posiciones = comandos.add_parser('posiciones', help="tabla de posiciones")
+    posiciones.add_argument('--hasta', help="fecha de corte (AAAA-MM-DD)")
+    posiciones.add_argument('--dias', type=int, help="sólo los últimos días antes del corte")
+    posiciones.add_argument('--ultimos', type=int, help="sólo los últimos partidos de cada jugador")
+
+    lote = comandos.add_parser('lote', help="atender una lista de solicitudes JSON en paralelo")
+    lote.add_argument('archivo', help="archivo JSON con una lista de solicitudes, o - para la entrada estándar")
+
+    servidor = comandos.add_parser('servir', help="servicio HTTP/JSON local")
+    servidor.add_argument('--anfitrion', default='127.0.0.1')
+    servidor.add_argument('--puerto', type=int, default=8765)
+
+    args = parser.parse_args(argv)
+    servicio = Servicio(args.base, args.trabajadores)
+    try:
+        if args.comando == 'generar':
+            solicitud = {clave: valor for clave, valor in vars(args).items()
+                         if valor is not None and clave not in ('base', 'trabajadores', 'comando')}
+            _imprimir(servicio.atender({'operacion': 'generar', **solicitud}))
+        elif args.comando == 'registrar':
+            _imprimir(servicio.atender({'operacion': 'registrar_partido', 'fecha': args.fecha,
+                                        'equipo1': [nombre.strip() for nombre in args.equipo1.split(',')],
+                                        'equipo2': [nombre.strip() for nombre in args.equipo2.split(',')],
+                                        'goles1': args.goles[0], 'goles2': args.goles[1]}))
+        elif args.comando == 'posiciones':
+            _imprimir(servicio.atender({'operacion': 'posiciones', 'hasta': args.hasta, 'dias': args.dias,
+                                        'ultimos': args.ultimos}))
+        elif args.comando == 'lote':
+            archivo = sys.stdin if args.archivo == '-' else open(args.archivo)
+            with archivo:
+                solicitudes = json.load(archivo)
+            for resultado in servicio.atender_lote(solicitudes):
+                _imprimir(resultado)
+        elif args.comando == 'servir':
+            print(f"Sirviendo en http://{args.anfitrion}:{args.puerto}", file=sys.stderr)
+            try:
+                servir(servicio, args.anfitrion, args.puerto)
+            except KeyboardInterrupt:
+                pass
+    finally:
+        servicio.cerrar()
+
+
+if __name__ == '__main__':
+    main()
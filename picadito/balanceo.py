@@ -0,0 +1,360 @@
+"""Motor de balanceo de equipos para el Picadito.
+
+Busca la división exacta de un plantel de ``2 * jugadores_por_equipo`` jugadores
+en dos equipos que minimiza la diferencia de victorias (o de cualquier otro
+peso por jugador) respetando las restricciones de posiciones.
+
+La búsqueda es un *meet-in-the-middle* sobre máscaras de bits:
+
+* El jugador 0 se fija en el equipo 1 (simetría: intercambiar los equipos da la
+  misma división), así que sólo se reparten los ``n - 1`` restantes.
+* Esos jugadores se parten en dos mitades A y B y se enumeran todos sus
+  subconjuntos como enteros. Los conteos por posición salen de un ``popcount``
+  de la máscara contra la máscara de defensores/mediocampistas/delanteros.
+* Para cada combinación de conteos de A se filtran los subconjuntos de B que
+  completan un equipo válido y se busca con ``searchsorted`` la suma de pesos
+  más cercana a la mitad del total.
+
+Con 30 jugadores son 2**14 + 2**15 subconjuntos, por lo que el óptimo exacto
+se obtiene en milisegundos; pasados los ``LIMITE_BUSQUEDA_EXACTA`` jugadores
+conviene la búsqueda local. No depende de Streamlit ni de pandas.
+
+Para planteles medianos ``evaluar_divisiones`` recorre en cambio *todas* las
+divisiones por lotes y devuelve las ``top`` más parejas, útil para ofrecer
+alternativas a la mejor. Esa evaluación acepta además un puntaje con varios
+objetivos (diferencia de goles, reparto de posiciones, un arquero por equipo)
+calculado por ``puntuar_divisiones``, el mismo que usa la búsqueda local de
+``picadito.busqueda_local`` para planteles grandes.
+"""
+from itertools import combinations, islice
+
+import numpy as np
+
+ARQUERO = 'Arquero'
+DEFENSOR = 'Defensor'
+MEDIOCAMPISTA = 'Mediocampista'
+DELANTERO = 'Delantero'
+
+# Hasta este tamaño de plantel conviene evaluar todas las divisiones (C(19, 9) = 92378 con 20 jugadores)
+LIMITE_EVALUACION_COMPLETA = 20
+
+# Hasta este tamaño la búsqueda exacta es rápida (2**17 + 2**18 subconjuntos con 36 jugadores); cada dos
+# jugadores más duplica tiempo y memoria, y la enumeración no se puede cancelar
+LIMITE_BUSQUEDA_EXACTA = 36
+
+# Columnas de caracteristicas_jugadores
+PESO, GOLES, DEFENSORES, MEDIOCAMPISTAS, DELANTEROS, ARQUEROS = range(6)
+
+
+def _popcount(valores):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(valores).astype(np.int64)
+    conteo = np.zeros(valores.shape, dtype=np.int64)
+    valores = valores.copy()
+    while valores.any():
+        conteo += valores & 1
+        valores >>= 1
+    return conteo
+
+
+def _mascara(indices):
+    mascara = 0
+    for bit in indices:
+        mascara |= 1 << bit
+    return mascara
+
+
+def _codificar_conteos(cantidad, defensores, mediocampistas, delanteros):
+    # Los cuatro conteos (cada uno menor a 32) en un solo entero, con el mismo orden lexicográfico
+    return ((cantidad * 32 + defensores) * 32 + mediocampistas) * 32 + delanteros
+
+
+def _enumerar_mitad(pesos, es_defensor, es_mediocampista, es_delantero):
+    """Enumera todos los subconjuntos de una mitad del plantel.
+
+    Devuelve un diccionario de arrays con la máscara, cantidad de jugadores,
+    conteos por posición y suma de pesos, sin repetir (conteos, suma).
+    """
+    h = len(pesos)
+    mascaras = np.arange(1 << h, dtype=np.int64)
+
+    # La suma de pesos se arma duplicando: la mitad alta de cada paso agrega al jugador j
+    sumas = np.zeros(1, dtype=np.float64)
+    for peso in pesos:
+        sumas = np.concatenate([sumas, sumas + peso])
+
+    cantidad = _popcount(mascaras)
+    defensores = _popcount(mascaras & _mascara(np.flatnonzero(es_defensor)))
+    mediocampistas = _popcount(mascaras & _mascara(np.flatnonzero(es_mediocampista)))
+    delanteros = _popcount(mascaras & _mascara(np.flatnonzero(es_delantero)))
+
+    # Subconjuntos con los mismos conteos y la misma suma son intercambiables: se ordenan
+    # por (conteos, suma) y se queda el primero de cada tramo, sin np.unique por filas
+    codigo = _codificar_conteos(cantidad, defensores, mediocampistas, delanteros)
+    orden = np.lexsort((sumas, codigo))
+    distinto = np.ones(len(orden), dtype=bool)
+    distinto[1:] = (np.diff(codigo[orden]) != 0) | (np.diff(sumas[orden]) != 0)
+    unicos = orden[distinto]
+    return {
+        'codigo': codigo[unicos],
+        'mascara': mascaras[unicos],
+        'cantidad': cantidad[unicos],
+        'defensores': defensores[unicos],
+        'mediocampistas': mediocampistas[unicos],
+        'delanteros': delanteros[unicos],
+        'suma': sumas[unicos],
+    }
+
+
+def _filtrar(mitad, seleccion):
+    return {columna: valores[seleccion] for columna, valores in mitad.items()}
+
+
+def _armar_division(pesos, indices_a, indices_b, mascara_a, mascara_b, enteros):
+    # Índices y sumas de ambos equipos a partir de las máscaras elegidas en cada mitad
+    equipo1 = [0]
+    equipo1 += [int(j) for bit, j in enumerate(indices_a) if mascara_a >> bit & 1]
+    equipo1 += [int(j) for bit, j in enumerate(indices_b) if mascara_b >> bit & 1]
+    en_equipo1 = set(equipo1)
+    equipo2 = [j for j in range(len(pesos)) if j not in en_equipo1]
+    suma1 = pesos[equipo1].sum()
+    suma2 = pesos[equipo2].sum()
+    if enteros:
+        suma1, suma2 = int(suma1), int(suma2)
+    return sorted(equipo1), equipo2, suma1, suma2
+
+
+def balancear_equipos(pesos, posiciones, jugadores_por_equipo, max_defensores,
+                      min_mediocampistas, min_delanteros, progreso=None,
+                      al_mejorar=None, detener=None):
+    """Devuelve la división óptima de los jugadores en dos equipos.
+
+    ``pesos`` y ``posiciones`` están alineados por jugador. El resultado es
+    ``(indices_equipo1, indices_equipo2, suma_equipo1, suma_equipo2)`` o ``None``
+    si no hay exactamente ``2 * jugadores_por_equipo`` jugadores o ninguna
+    división cumple las restricciones. ``progreso`` es un callable opcional
+    que recibe la fracción (0 a 1) de la búsqueda completada.
+
+    ``al_mejorar`` recibe cada división que mejora a la anterior, con el mismo
+    formato del resultado. Si ``detener`` devuelve ``True`` la búsqueda se
+    corta y se devuelve la mejor división encontrada hasta ese momento.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    posiciones = np.asarray(posiciones, dtype=object)
+    n = len(pesos)
+    k = int(jugadores_por_equipo)
+    if k < 1 or n != 2 * k:
+        return None
+
+    es_defensor = posiciones == DEFENSOR
+    es_mediocampista = posiciones == MEDIOCAMPISTA
+    es_delantero = posiciones == DELANTERO
+
+    # Rangos válidos de cada posición en el equipo 1; el equipo 2 recibe el resto
+    total_def = int(es_defensor.sum())
+    total_med = int(es_mediocampista.sum())
+    total_del = int(es_delantero.sum())
+    rango_def = (total_def - max_defensores, max_defensores)
+    rango_med = (min_mediocampistas, total_med - min_mediocampistas)
+    rango_del = (min_delanteros, total_del - min_delanteros)
+    if any(bajo > alto for bajo, alto in (rango_def, rango_med, rango_del)):
+        return None
+
+    total = pesos.sum()
+    enteros = np.all(pesos == np.round(pesos))
+    # Cota inferior de |suma1 - suma2|: con pesos enteros no se puede bajar de la paridad del total
+    cota = float(total % 2) if enteros else 0.0
+
+    # Simetría: el jugador 0 va siempre al equipo 1
+    resto = np.arange(1, n)
+    mitad = len(resto) // 2
+    indices_a, indices_b = resto[:mitad], resto[mitad:]
+    a = _enumerar_mitad(pesos[indices_a], es_defensor[indices_a], es_mediocampista[indices_a], es_delantero[indices_a])
+    b = _enumerar_mitad(pesos[indices_b], es_defensor[indices_b], es_mediocampista[indices_b], es_delantero[indices_b])
+
+    # B ordenado por suma y separado por cantidad de jugadores
+    orden_b = np.argsort(b['suma'], kind='stable')
+    b = _filtrar(b, orden_b)
+    b_por_cantidad = {c: _filtrar(b, b['cantidad'] == c) for c in np.unique(b['cantidad'])}
+
+    objetivo = total / 2 - pesos[0]
+    base_def, base_med, base_del = int(es_defensor[0]), int(es_mediocampista[0]), int(es_delantero[0])
+
+    # Agrupar A por (cantidad, defensores, mediocampistas, delanteros): ya viene ordenado por
+    # esos conteos, así que cada grupo es un tramo contiguo
+    _, inicios, tamanos = np.unique(a['codigo'], return_index=True, return_counts=True)
+    grupos = np.column_stack([a['cantidad'], a['defensores'], a['mediocampistas'], a['delanteros']])[inicios]
+
+    mejor = None
+    mejor_diferencia = np.inf
+    for g, (cant_a, def_a, med_a, del_a) in enumerate(grupos):
+        if detener is not None and detener():
+            break
+        if progreso is not None:
+            progreso(g / len(grupos))
+        candidatos = b_por_cantidad.get(k - 1 - cant_a)
+        if candidatos is None:
+            continue
+        def_b = candidatos['defensores'] + def_a + base_def
+        med_b = candidatos['mediocampistas'] + med_a + base_med
+        del_b = candidatos['delanteros'] + del_a + base_del
+        validos = ((def_b >= rango_def[0]) & (def_b <= rango_def[1]) &
+                   (med_b >= rango_med[0]) & (med_b <= rango_med[1]) &
+                   (del_b >= rango_del[0]) & (del_b <= rango_del[1]))
+        if not validos.any():
+            continue
+        sumas_b = candidatos['suma'][validos]
+        mascaras_b = candidatos['mascara'][validos]
+
+        en_grupo = slice(inicios[g], inicios[g] + tamanos[g])
+        sumas_a = a['suma'][en_grupo]
+        mascaras_a = a['mascara'][en_grupo]
+
+        # Para cada subconjunto de A, la suma de B más cercana al objetivo
+        faltante = objetivo - sumas_a
+        pos = np.searchsorted(sumas_b, faltante)
+        cerca = np.stack([np.clip(pos - 1, 0, len(sumas_b) - 1), np.clip(pos, 0, len(sumas_b) - 1)])
+        error = np.abs(sumas_b[cerca] - faltante)
+        fila = np.argmin(error, axis=0)
+        elegido = cerca[fila, np.arange(len(sumas_a))]
+        diferencias = 2 * error[fila, np.arange(len(sumas_a))]
+
+        i = int(np.argmin(diferencias))
+        if diferencias[i] < mejor_diferencia - 1e-9:
+            mejor_diferencia = diferencias[i]
+            mejor = (int(mascaras_a[i]), int(mascaras_b[elegido[i]]))
+            if al_mejorar is not None:
+                al_mejorar(_armar_division(pesos, indices_a, indices_b, *mejor, enteros))
+            if mejor_diferencia <= cota + 1e-9:
+                break
+
+    if progreso is not None:
+        progreso(1.0)
+    if mejor is None:
+        return None
+
+    return _armar_division(pesos, indices_a, indices_b, *mejor, enteros)
+
+
+def caracteristicas_jugadores(pesos, posiciones, diferencias_goles=None):
+    """Matriz de una fila por jugador con peso, diferencia de goles y una columna 0/1 por posición.
+
+    Las sumas de un equipo son la suma de las filas de sus jugadores, así que
+    cambiar un jugador por otro sólo resta una fila y suma otra.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    posiciones = np.asarray(posiciones, dtype=object)
+    if diferencias_goles is None:
+        diferencias_goles = np.zeros(len(pesos))
+    return np.column_stack([
+        pesos,
+        np.asarray(diferencias_goles, dtype=np.float64),
+        posiciones == DEFENSOR,
+        posiciones == MEDIOCAMPISTA,
+        posiciones == DELANTERO,
+        posiciones == ARQUERO,
+    ]).astype(np.float64)
+
+
+def minimo_arqueros(caracteristicas, un_arquero_por_equipo):
+    # Con dos o más arqueros cada equipo necesita uno; con menos la regla no se puede cumplir y se ignora
+    if un_arquero_por_equipo and caracteristicas[:, ARQUEROS].sum() >= 2:
+        return 1
+    return 0
+
+
+def puntuar_divisiones(equipo1, totales, max_defensores, min_mediocampistas, min_delanteros, min_arqueros=0,
+                       ponderacion=1.0, ponderacion_goles=0.0, ponderacion_posiciones=0.0):
+    """Puntaje y violación de las restricciones de cada división.
+
+    ``equipo1`` tiene en la última dimensión las sumas de las columnas de
+    ``caracteristicas_jugadores`` para el equipo 1; el equipo 2 es
+    ``totales - equipo1``. El puntaje suma las diferencias de peso, de goles y
+    de cantidad de jugadores por posición, cada una con su ponderación. La
+    violación cuenta cuántos jugadores sobran o faltan en cada posición para
+    cumplir las restricciones: 0 si la división es válida.
+    """
+    equipo2 = totales - equipo1
+    diferencias = np.abs(equipo1 - equipo2)
+    puntaje = diferencias[..., PESO] * ponderacion
+    if ponderacion_goles:
+        puntaje = puntaje + diferencias[..., GOLES] * ponderacion_goles
+    if ponderacion_posiciones:
+        puntaje = puntaje + diferencias[..., DEFENSORES:].sum(axis=-1) * ponderacion_posiciones
+    violacion = 0
+    for equipo in (equipo1, equipo2):
+        violacion = (violacion +
+                     np.maximum(equipo[..., DEFENSORES] - max_defensores, 0) +
+                     np.maximum(min_mediocampistas - equipo[..., MEDIOCAMPISTAS], 0) +
+                     np.maximum(min_delanteros - equipo[..., DELANTEROS], 0) +
+                     np.maximum(min_arqueros - equipo[..., ARQUEROS], 0))
+    return puntaje, violacion
+
+
+def evaluar_divisiones(pesos, posiciones, jugadores_por_equipo, max_defensores,
+                       min_mediocampistas, min_delanteros, ponderacion=1.0,
+                       top=5, tamano_lote=20000, diferencias_goles=None,
+                       ponderacion_goles=0.0, ponderacion_posiciones=0.0,
+                       un_arquero_por_equipo=False, detener=None):
+    """Evalúa todas las divisiones por lotes y devuelve las ``top`` más parejas.
+
+    Cada lote de combinaciones se codifica como una matriz de pertenencia 0/1
+    y se multiplica por ``caracteristicas_jugadores`` para obtener sumas y
+    conteos de ambos equipos de una vez. Devuelve una lista de
+    ``(indices_equipo1, indices_equipo2, suma_equipo1, suma_equipo2, puntaje)``
+    ordenada de menor a mayor puntaje (con las ponderaciones por defecto, la
+    diferencia ponderada de pesos); vacía si ninguna división cumple las
+    restricciones. Si ``detener`` devuelve ``True`` entre lotes se devuelve lo
+    evaluado hasta ese momento.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    n = len(pesos)
+    k = int(jugadores_por_equipo)
+    if k < 1 or n != 2 * k:
+        return []
+
+    caracteristicas = caracteristicas_jugadores(pesos, posiciones, diferencias_goles)
+    totales = caracteristicas.sum(axis=0)
+    min_arqueros = minimo_arqueros(caracteristicas, un_arquero_por_equipo)
+    enteros = np.all(pesos == np.round(pesos))
+
+    # Simetría: el jugador 0 va siempre al equipo 1
+    combos = combinations(range(1, n), k - 1)
+    mejores_filas = np.empty((0, k), dtype=np.int64)
+    mejores_diferencias = np.empty(0, dtype=np.float64)
+    while detener is None or not detener():
+        filas = list(islice(combos, tamano_lote))
+        if not filas:
+            break
+        lote = np.array(filas, dtype=np.int64).reshape(len(filas), k - 1)
+        lote = np.column_stack([np.zeros(len(lote), dtype=np.int64), lote])
+
+        miembros = np.zeros((len(lote), n), dtype=np.float64)
+        miembros[np.arange(len(lote))[:, None], lote] = 1
+        puntajes, violaciones = puntuar_divisiones(miembros @ caracteristicas, totales, max_defensores,
+                                                   min_mediocampistas, min_delanteros, min_arqueros,
+                                                   ponderacion, ponderacion_goles, ponderacion_posiciones)
+        validos = violaciones == 0
+        diferencias = puntajes[validos]
+        lote = lote[validos]
+        if len(diferencias) > top:
+            seleccion = np.argpartition(diferencias, top)[:top]
+            lote, diferencias = lote[seleccion], diferencias[seleccion]
+
+        # Quedarse con las mejores acumuladas, priorizando las encontradas antes en caso de empate
+        mejores_filas = np.concatenate([mejores_filas, lote])
+        mejores_diferencias = np.concatenate([mejores_diferencias, diferencias])
+        orden = np.argsort(mejores_diferencias, kind='stable')[:top]
+        mejores_filas, mejores_diferencias = mejores_filas[orden], mejores_diferencias[orden]
+
+    resultados = []
+    for fila, diferencia in zip(mejores_filas, mejores_diferencias):
+        equipo1 = [int(j) for j in fila]
+        en_equipo1 = set(equipo1)
+        equipo2 = [j for j in range(n) if j not in en_equipo1]
+        suma1 = pesos[equipo1].sum()
+        suma2 = pesos[equipo2].sum()
+        if enteros:
+            suma1, suma2 = int(suma1), int(suma2)
+        resultados.append((equipo1, equipo2, suma1, suma2, float(diferencia)))
+    return resultados
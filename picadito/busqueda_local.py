@@ -0,0 +1,162 @@
+"""Búsqueda local con recocido para dividir planteles grandes con varios objetivos.
+
+Cuando el puntaje combina peso, diferencia de goles, reparto de posiciones y
+arqueros, el *meet-in-the-middle* de ``picadito.balanceo`` ya no aplica y
+evaluar todas las divisiones deja de ser viable pasados los 20 jugadores. Esta
+búsqueda parte de un reparto en serpentina por peso y alterna:
+
+* Descenso por intercambios: se evalúan de una vez todos los cambios de un
+  jugador del equipo 1 por uno del equipo 2. Como las sumas de un equipo son
+  la suma de las filas de ``caracteristicas_jugadores``, cada intercambio es
+  ``sumas - fila_i + fila_j`` y el puntaje se recalcula sin recorrer el plantel.
+* Perturbación y aceptación por recocido: desde el óptimo local se hacen unos
+  intercambios al azar, se vuelve a descender y el nuevo óptimo se acepta si
+  mejora o, con probabilidad ``exp(-delta / temperatura)``, aunque empeore. La
+  temperatura baja a medida que se consume el tiempo disponible. Si la mejor
+  división no cambia en muchas vueltas se reinicia desde un reparto al azar.
+
+Las restricciones de posiciones entran como penalización lexicográfica: una
+división que las viola siempre puntúa peor que cualquiera válida, y al final
+sólo se devuelve la mejor división válida encontrada.
+"""
+import time
+
+import numpy as np
+
+from picadito.balanceo import (
+    ARQUEROS, DEFENSORES, DELANTEROS, GOLES, MEDIOCAMPISTAS, PESO,
+    caracteristicas_jugadores, minimo_arqueros, puntuar_divisiones,
+)
+
+# Vueltas seguidas sin mejorar la mejor división antes de reiniciar desde un reparto al azar
+REINICIO = 50
+
+
+def _reparto_inicial(pesos):
+    # Serpentina por peso: 1-2-2-1-1-2-... deja las sumas de ambos equipos cerca
+    orden = np.argsort(-pesos, kind='stable')
+    en_equipo1 = np.zeros(len(pesos), dtype=bool)
+    en_equipo1[orden[(np.arange(len(orden)) % 4 == 0) | (np.arange(len(orden)) % 4 == 3)]] = True
+    return en_equipo1
+
+
+def buscar_division(pesos, posiciones, jugadores_por_equipo, max_defensores, min_mediocampistas,
+                    min_delanteros, ponderacion=1.0, diferencias_goles=None, ponderacion_goles=0.0,
+                    ponderacion_posiciones=0.0, un_arquero_por_equipo=False, tiempo_limite=1.0,
+                    semilla=None, progreso=None, al_mejorar=None, detener=None):
+    """Devuelve la mejor división válida encontrada dentro de ``tiempo_limite`` segundos.
+
+    El resultado es ``(indices_equipo1, indices_equipo2, suma_equipo1,
+    suma_equipo2, puntaje)`` como en ``evaluar_divisiones``, o ``None`` si no
+    hay exactamente ``2 * jugadores_por_equipo`` jugadores o ninguna división
+    cumple las restricciones. ``progreso``, ``al_mejorar`` y ``detener`` se
+    comportan como en ``balancear_equipos``.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    n = len(pesos)
+    k = int(jugadores_por_equipo)
+    if k < 1 or n != 2 * k:
+        return None
+
+    caracteristicas = caracteristicas_jugadores(pesos, posiciones, diferencias_goles)
+    totales = caracteristicas.sum(axis=0)
+    min_arqueros = minimo_arqueros(caracteristicas, un_arquero_por_equipo)
+    restricciones = (max_defensores, min_mediocampistas, min_delanteros, min_arqueros,
+                     ponderacion, ponderacion_goles, ponderacion_posiciones)
+
+    # Si los totales por posición no alcanzan para ningún reparto, no hay nada que buscar
+    if (totales[DEFENSORES] - max_defensores > max_defensores or
+            2 * min_mediocampistas > totales[MEDIOCAMPISTAS] or
+            2 * min_delanteros > totales[DELANTEROS] or
+            2 * min_arqueros > totales[ARQUEROS] or
+            min_mediocampistas + min_delanteros + min_arqueros > k):
+        return None
+
+    # Una violación pesa más que el peor puntaje posible: la comparación es lexicográfica
+    escala = 1 + (ponderacion * np.abs(caracteristicas[:, PESO]).sum() +
+                  ponderacion_goles * np.abs(caracteristicas[:, GOLES]).sum() +
+                  ponderacion_posiciones * n)
+    # Cota inferior del puntaje: con valores enteros ninguna diferencia baja de la paridad del total
+    cota = sum(p * (totales[c] % 2) for p, c in ((ponderacion, PESO), (ponderacion_goles, GOLES))
+               if np.all(caracteristicas[:, c] == np.round(caracteristicas[:, c])))
+    cota += ponderacion_posiciones * (totales[DEFENSORES:] % 2).sum()
+
+    def costo(sumas):
+        puntaje, violacion = puntuar_divisiones(sumas, totales, *restricciones)
+        return violacion * escala + puntaje
+
+    def descender(en_equipo1):
+        # Intercambio más conveniente entre un jugador de cada equipo, hasta que ninguno mejore
+        sumas = caracteristicas[en_equipo1].sum(axis=0)
+        actual = costo(sumas)
+        while True:
+            equipo1, equipo2 = np.flatnonzero(en_equipo1), np.flatnonzero(~en_equipo1)
+            vecinos = sumas + caracteristicas[equipo2][None, :, :] - caracteristicas[equipo1][:, None, :]
+            costos = costo(vecinos)
+            i, j = np.unravel_index(np.argmin(costos), costos.shape)
+            if costos[i, j] >= actual - 1e-9:
+                return en_equipo1, actual
+            en_equipo1[equipo1[i]], en_equipo1[equipo2[j]] = False, True
+            sumas, actual = vecinos[i, j], costos[i, j]
+
+    azar = np.random.default_rng(semilla)
+    inicio = time.perf_counter()
+    actual, costo_actual = descender(_reparto_inicial(pesos))
+    mejor, costo_mejor = actual.copy(), costo_actual
+    if costo_mejor < escala and al_mejorar is not None:
+        al_mejorar(_armar(pesos, caracteristicas, mejor, restricciones, totales))
+
+    temperatura_inicial = max(escala / (10 * n), 1e-9)
+    sin_mejora = 0
+    while costo_mejor > cota + 1e-9:
+        transcurrido = (time.perf_counter() - inicio) / tiempo_limite if tiempo_limite > 0 else 1.0
+        if transcurrido >= 1.0 or (detener is not None and detener()):
+            break
+        if progreso is not None:
+            progreso(transcurrido)
+
+        # Perturbar el óptimo actual con algunos intercambios al azar y volver a descender;
+        # tras muchas vueltas sin mejorar se reinicia desde un reparto al azar
+        if sin_mejora >= REINICIO:
+            candidato = np.zeros(n, dtype=bool)
+            candidato[azar.permutation(n)[:k]] = True
+            sin_mejora = 0
+        else:
+            candidato = actual.copy()
+            equipo1, equipo2 = np.flatnonzero(candidato), np.flatnonzero(~candidato)
+            intercambios = int(azar.integers(1, max(1, k // 2) + 1))
+            salen = azar.choice(equipo1, intercambios, replace=False)
+            entran = azar.choice(equipo2, intercambios, replace=False)
+            candidato[salen], candidato[entran] = False, True
+        candidato, costo_candidato = descender(candidato)
+        sin_mejora += 1
+
+        temperatura = temperatura_inicial * (1.0 - transcurrido)
+        delta = costo_candidato - costo_actual
+        if delta <= 0 or azar.random() < np.exp(-delta / max(temperatura, 1e-12)):
+            actual, costo_actual = candidato, costo_candidato
+        if costo_candidato < costo_mejor - 1e-9:
+            mejor, costo_mejor = candidato.copy(), costo_candidato
+            sin_mejora = 0
+            if costo_mejor < escala and al_mejorar is not None:
+                al_mejorar(_armar(pesos, caracteristicas, mejor, restricciones, totales))
+
+    if progreso is not None:
+        progreso(1.0)
+    if costo_mejor >= escala:
+        return None
+    return _armar(pesos, caracteristicas, mejor, restricciones, totales)
+
+
+def _armar(pesos, caracteristicas, en_equipo1, restricciones, totales):
+    # Índices, sumas de peso y puntaje de una división válida
+    equipo1 = [int(j) for j in np.flatnonzero(en_equipo1)]
+    equipo2 = [int(j) for j in np.flatnonzero(~en_equipo1)]
+    # Mismo convenio que el resto del motor: el jugador 0 en el equipo 1
+    if equipo1[0] != 0:
+        equipo1, equipo2 = equipo2, equipo1
+    puntaje, _ = puntuar_divisiones(caracteristicas[equipo1].sum(axis=0), totales, *restricciones)
+    suma1, suma2 = pesos[equipo1].sum(), pesos[equipo2].sum()
+    if np.all(pesos == np.round(pesos)):
+        suma1, suma2 = int(suma1), int(suma2)
+    return equipo1, equipo2, suma1, suma2, float(puntaje)
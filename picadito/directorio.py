@@ -0,0 +1,69 @@
+"""Tabla de jugadores por id, compartida por todas las pestañas.
+
+Los equipos se guardan como ids enteros (``partido_jugadores``,
+``equipos_generados_jugadores``, ``jornada_equipos``); el nombre y la posición
+se resuelven al mostrarlos con un ``Directorio``. Así renombrar un jugador no
+rompe su historial y no hace falta partir textos separados por comas. La
+generación de equipos trabaja con los nombres elegidos en pantalla, que se
+pasan a ids al guardar.
+
+Las columnas de texto ``equipo1``/``equipo2`` de ``partidos`` y
+``equipos_generados`` se siguen escribiendo a propósito: son el registro
+legible de quién jugó con el nombre de ese momento, y el historial las muestra
+cuando a un equipo le faltan participantes (partidos anteriores a los ids o
+jugadores ya borrados). Ninguna búsqueda ni estadística las lee.
+
+Internamente los ids quedan ordenados en un arreglo de NumPy: pasar de ids a
+nombres es un ``searchsorted`` para todo el equipo.
+"""
+
+
+def cargar_directorio(conexion):
+    # Todos los jugadores, en una sola consulta
+    filas = conexion.execute("SELECT id, nombre, posicion FROM jugadores ORDER BY id").fetchall()
+    return Directorio([fila[0] for fila in filas], [fila[1] for fila in filas], [fila[2] for fila in filas])
+
+
+class Directorio:
+    """Ids, nombres y posiciones de los jugadores, ordenados por id."""
+
+    def __init__(self, ids, nombres, posiciones):
+        import numpy as np
+
+        orden = np.argsort(np.asarray(ids, dtype=np.int64), kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[orden]
+        self.nombres = np.asarray(nombres, dtype=object)[orden]
+        self.posiciones = np.asarray(posiciones, dtype=object)[orden]
+        self._por_nombre = {nombre: int(jugador_id) for jugador_id, nombre in zip(self.ids, self.nombres)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def indices(self, ids):
+        # Posición de cada id en el directorio; -1 para los que no existen (jugadores borrados)
+        import numpy as np
+        ids = np.asarray(ids, dtype=np.int64)
+        indices = np.searchsorted(self.ids, ids)
+        encontrados = indices < len(self.ids)
+        encontrados[encontrados] = self.ids[indices[encontrados]] == ids[encontrados]
+        return np.where(encontrados, indices, -1)
+
+    def nombres_de(self, ids):
+        # Nombres actuales de los ids, en el mismo orden; se omiten los que ya no existen
+        indices = self.indices(ids)
+        return self.nombres[indices[indices >= 0]].tolist()
+
+    def id_de(self, nombre):
+        return self._por_nombre.get(nombre)
+
+    def ids_de(self, nombres):
+        # Ids de los nombres dados, en el mismo orden; se omiten los que no existen
+        import numpy as np
+        return np.array([self._por_nombre[nombre] for nombre in nombres if nombre in self._por_nombre], dtype=np.int64)
+
+    def tabla(self, ids):
+        # Nombre y posición de un equipo, en el orden recibido
+        import pandas as pd
+        indices = self.indices(ids)
+        indices = indices[indices >= 0]
+        return pd.DataFrame({'nombre': self.nombres[indices], 'posicion': self.posiciones[indices]})
@@ -0,0 +1,64 @@
+"""Ratings Elo por jugador a partir de los resultados de los partidos.
+
+Cada equipo juega con el promedio de los ratings de sus jugadores. Tras un
+partido, todos los jugadores de un equipo suman (o restan) el mismo delta:
+
+    delta = K * G * (S - E)
+
+donde ``S`` es 1, 0.5 o 0 según gane, empate o pierda, ``E`` es la
+probabilidad esperada de ganar según la diferencia de ratings y ``G`` es el
+multiplicador por diferencia de goles del ranking Elo de selecciones (1 para
+un gol, 1.5 para dos, (11 + N) / 8 para N >= 3). Actualizar un partido cuesta
+O(tamaño del equipo). No depende de Streamlit ni de pandas.
+"""
+
+RATING_INICIAL = 1000.0
+FACTOR_K = 24.0
+
+
+def multiplicador_goles(goles1, goles2):
+    diferencia = abs(goles1 - goles2)
+    if diferencia <= 1:
+        return 1.0
+    if diferencia == 2:
+        return 1.5
+    return (11 + diferencia) / 8
+
+
+def delta_partido(ratings_equipo1, ratings_equipo2, goles1, goles2, factor_k=FACTOR_K):
+    """Puntos que gana cada jugador del equipo 1 (el equipo 2 pierde los mismos)."""
+    if not ratings_equipo1 or not ratings_equipo2:
+        return 0.0
+    rating1 = sum(ratings_equipo1) / len(ratings_equipo1)
+    rating2 = sum(ratings_equipo2) / len(ratings_equipo2)
+    esperado = 1 / (1 + 10 ** ((rating2 - rating1) / 400))
+    resultado = 1.0 if goles1 > goles2 else 0.5 if goles1 == goles2 else 0.0
+    return factor_k * multiplicador_goles(goles1, goles2) * (resultado - esperado)
+
+
+def aplicar_partido(ratings, equipo1, equipo2, goles1, goles2, factor_k=FACTOR_K):
+    """Actualiza en el lugar el diccionario ``ratings`` (id -> rating) con un partido.
+
+    Devuelve el delta aplicado a cada jugador del equipo 1.
+    """
+    delta = delta_partido([ratings.get(j, RATING_INICIAL) for j in equipo1],
+                          [ratings.get(j, RATING_INICIAL) for j in equipo2],
+                          goles1, goles2, factor_k)
+    for jugador in equipo1:
+        ratings[jugador] = ratings.get(jugador, RATING_INICIAL) + delta
+    for jugador in equipo2:
+        ratings[jugador] = ratings.get(jugador, RATING_INICIAL) - delta
+    return delta
+
+
+def recalcular_ratings(partidos, factor_k=FACTOR_K):
+    """Recalcula todos los ratings en una pasada sobre ``partidos``.
+
+    ``partidos`` es un iterable, en orden cronológico, de tuplas
+    ``(equipo1, equipo2, goles1, goles2)`` con los ids de cada equipo; se
+    consume en streaming, sin materializar el historial.
+    """
+    ratings = {}
+    for equipo1, equipo2, goles1, goles2 in partidos:
+        aplicar_partido(ratings, equipo1, equipo2, goles1, goles2, factor_k)
+    return ratings
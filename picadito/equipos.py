@@ -0,0 +1,123 @@
+"""Generación de equipos parejos a partir de los nombres de los convocados.
+
+Traduce nombres a pesos (victorias o rating Elo), diferencias de goles y
+posiciones, elige el motor de búsqueda y devuelve los equipos otra vez como
+nombres:
+
+* Sólo peso y hasta ``LIMITE_BUSQUEDA_EXACTA`` jugadores: búsqueda exacta de
+  ``balanceo.balancear_equipos``.
+* Varios criterios y hasta ``LIMITE_EVALUACION_COMPLETA`` jugadores: evaluación
+  de todas las divisiones con ``balanceo.evaluar_divisiones``.
+* Varios criterios en planteles más grandes, o cualquier plantel de más de
+  ``LIMITE_BUSQUEDA_EXACTA``: ``busqueda_local.buscar_division`` con un tiempo límite.
+* Más de dos equipos: ``particion.dividir_en_equipos``, que equilibra sólo el
+  peso y las restricciones de posiciones.
+"""
+from picadito.estadisticas import obtener_diferencias_goles, obtener_ratings_jugadores, obtener_victorias_jugadores
+from picadito.elo import RATING_INICIAL
+from picadito.repositorio import obtener_posiciones
+
+
+def obtener_datos_balanceo(conexion, jugadores_disponibles, objetivo='victorias'):
+    # Peso, posición y diferencia de goles de cada jugador, en el orden en que fueron seleccionados
+    import numpy as np
+
+    if objetivo == 'rating':
+        ratings_por_nombre = obtener_ratings_jugadores(conexion)
+        pesos = np.array([ratings_por_nombre.get(nombre, RATING_INICIAL) for nombre in jugadores_disponibles], dtype=np.float64)
+    else:
+        victorias_por_nombre = obtener_victorias_jugadores(conexion)
+        pesos = np.array([victorias_por_nombre.get(nombre, 0) for nombre in jugadores_disponibles], dtype=np.int64)
+    posiciones_por_nombre = obtener_posiciones(conexion)
+    posiciones = np.array([posiciones_por_nombre.get(nombre) or '' for nombre in jugadores_disponibles], dtype=object)
+    diferencias_por_nombre = obtener_diferencias_goles(conexion)
+    diferencias_goles = np.array([diferencias_por_nombre.get(nombre, 0) for nombre in jugadores_disponibles], dtype=np.int64)
+    return pesos, posiciones, diferencias_goles
+
+
+def dividir_plantel(pesos, posiciones, jugadores_por_equipo, max_defensores, min_mediocampistas, min_delanteros,
+                    ponderacion_victorias, diferencias_goles=None, ponderacion_goles=0.0, ponderacion_posiciones=0.0,
+                    un_arquero_por_equipo=False, tiempo_limite=5.0, progreso=None, al_mejorar=None, detener=None):
+    # Mejor división por índices, (equipo1, equipo2, peso1, peso2, puntaje), o None si ninguna cumple las restricciones
+    from picadito.balanceo import LIMITE_BUSQUEDA_EXACTA, LIMITE_EVALUACION_COMPLETA, balancear_equipos, evaluar_divisiones
+
+    solo_peso = not ponderacion_goles and not ponderacion_posiciones and not un_arquero_por_equipo
+    if solo_peso and len(pesos) <= LIMITE_BUSQUEDA_EXACTA:
+        def con_puntaje(division):
+            return tuple(division) + (abs(division[2] - division[3]) * ponderacion_victorias,)
+
+        resultado = balancear_equipos(pesos, posiciones, jugadores_por_equipo, max_defensores,
+                                      min_mediocampistas, min_delanteros, progreso=progreso,
+                                      al_mejorar=None if al_mejorar is None else lambda division: al_mejorar(con_puntaje(division)),
+                                      detener=detener)
+        return None if resultado is None else con_puntaje(resultado)
+
+    criterios = dict(diferencias_goles=diferencias_goles, ponderacion_goles=ponderacion_goles,
+                     ponderacion_posiciones=ponderacion_posiciones, un_arquero_por_equipo=un_arquero_por_equipo)
+    if len(pesos) <= LIMITE_EVALUACION_COMPLETA:
+        mejores = evaluar_divisiones(pesos, posiciones, jugadores_por_equipo, max_defensores, min_mediocampistas,
+                                     min_delanteros, ponderacion_victorias, top=1, detener=detener, **criterios)
+        if progreso is not None:
+            progreso(1.0)
+        return mejores[0] if mejores else None
+
+    from picadito.busqueda_local import buscar_division
+    return buscar_division(pesos, posiciones, jugadores_por_equipo, max_defensores, min_mediocampistas,
+                           min_delanteros, ponderacion_victorias, tiempo_limite=tiempo_limite, progreso=progreso,
+                           al_mejorar=al_mejorar, detener=detener, **criterios)
+
+
+def nombrar_division(jugadores_disponibles, division):
+    # Pasa una división por índices al formato por nombres de generar_equipos
+    indices_equipo1, indices_equipo2, peso_equipo1, peso_equipo2, puntaje = division
+    equipo1 = [jugadores_disponibles[i] for i in indices_equipo1]
+    equipo2 = [jugadores_disponibles[i] for i in indices_equipo2]
+    return (equipo1, equipo2), peso_equipo1, peso_equipo2, puntaje
+
+
+def generar_equipos(conexion, jugadores_disponibles, jugadores_por_equipo, max_defensores, min_mediocampistas,
+                    min_delanteros, ponderacion_victorias, objetivo='victorias', progreso=None, **criterios):
+    # Mejor división según los criterios; devuelve None si ninguna cumple las restricciones
+    pesos, posiciones, diferencias_goles = obtener_datos_balanceo(conexion, jugadores_disponibles, objetivo)
+    resultado = dividir_plantel(pesos, posiciones, jugadores_por_equipo, max_defensores, min_mediocampistas,
+                                min_delanteros, ponderacion_victorias, diferencias_goles, progreso=progreso, **criterios)
+    if resultado is None:
+        return None
+    return nombrar_division(jugadores_disponibles, resultado)
+
+
+def nombrar_alternativas(jugadores_disponibles, alternativas):
+    # Pasa las divisiones de evaluar_divisiones a nombres, conservando sumas y puntaje
+    return [([jugadores_disponibles[i] for i in indices_equipo1],
+             [jugadores_disponibles[i] for i in indices_equipo2],
+             peso_equipo1, peso_equipo2, puntaje)
+            for indices_equipo1, indices_equipo2, peso_equipo1, peso_equipo2, puntaje in alternativas]
+
+
+def generar_alternativas(conexion, jugadores_disponibles, jugadores_por_equipo, max_defensores, min_mediocampistas,
+                         min_delanteros, ponderacion_victorias, objetivo='victorias', top=5,
+                         ponderacion_goles=0.0, ponderacion_posiciones=0.0, un_arquero_por_equipo=False):
+    # Evaluar todas las divisiones de una vez y devolver las más parejas
+    from picadito.balanceo import evaluar_divisiones
+
+    pesos, posiciones, diferencias_goles = obtener_datos_balanceo(conexion, jugadores_disponibles, objetivo)
+    alternativas = evaluar_divisiones(pesos, posiciones, jugadores_por_equipo, max_defensores,
+                                      min_mediocampistas, min_delanteros, ponderacion_victorias, top=top,
+                                      diferencias_goles=diferencias_goles, ponderacion_goles=ponderacion_goles,
+                                      ponderacion_posiciones=ponderacion_posiciones,
+                                      un_arquero_por_equipo=un_arquero_por_equipo)
+    return nombrar_alternativas(jugadores_disponibles, alternativas)
+
+
+def generar_equipos_jornada(conexion, jugadores_disponibles, cantidad_equipos, jugadores_por_equipo, max_defensores,
+                            min_mediocampistas, min_delanteros, objetivo='victorias', tiempo_limite=0.5):
+    # Reparto en más de dos equipos: (equipos como listas de nombres, peso de cada uno, diferencia), o None
+    from picadito.particion import dividir_en_equipos
+
+    pesos, posiciones, _ = obtener_datos_balanceo(conexion, jugadores_disponibles, objetivo)
+    resultado = dividir_en_equipos(pesos, posiciones, cantidad_equipos, jugadores_por_equipo, max_defensores,
+                                   min_mediocampistas, min_delanteros, tiempo_limite=tiempo_limite)
+    if resultado is None:
+        return None
+    indices, sumas, diferencia = resultado
+    return [[jugadores_disponibles[i] for i in equipo] for equipo in indices], sumas, diferencia
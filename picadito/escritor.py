@@ -0,0 +1,61 @@
+"""Cola única de escrituras a la base, para varias sesiones a la vez.
+
+SQLite admite un solo escritor por vez; si cada sesión escribe por su cuenta,
+las transacciones compiten por el lock y alguna termina con "database is
+locked". Un ``Escritor`` tiene un hilo y una conexión propios que aplican las
+escrituras de a una, en orden de llegada, cada una como una transacción con
+``repositorio.con_reintentos`` (por si otro proceso, como la línea de
+comandos, tiene el lock en ese momento).
+
+Cada escritura corre en una copia del contexto (``contextvars``) de quien la
+encoló, así lo que se mide por sesión (``picadito.metricas``) incluye sus
+escrituras.
+
+Las lecturas siguen en otra conexión: en modo WAL ven la última transacción
+confirmada y no esperan a que termine la que está en curso.
+"""
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future
+
+from picadito import repositorio
+
+
+class Escritor:
+    """Hilo dedicado, con su propia conexión, que ejecuta las escrituras encoladas."""
+
+    def __init__(self, ruta=repositorio.RUTA_BASE):
+        self.conexion = repositorio.conectar(ruta)
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._atender, name='escritor', daemon=True)
+        self._hilo.start()
+
+    def enviar(self, funcion, *args, **kwargs):
+        # Encola funcion(conexion, *args, **kwargs) y devuelve un Future con su resultado
+        futuro = Future()
+        self._cola.put((contextvars.copy_context(), funcion, args, kwargs, futuro))
+        return futuro
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        # Como enviar, pero espera el resultado; las excepciones de la escritura se propagan
+        return self.enviar(funcion, *args, **kwargs).result()
+
+    def cerrar(self):
+        # Termina las escrituras pendientes y cierra la conexión
+        self._cola.put(None)
+        self._hilo.join()
+        self.conexion.close()
+
+    def _atender(self):
+        while True:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                return
+            contexto, funcion, args, kwargs, futuro = trabajo
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(contexto.run(repositorio.con_reintentos, funcion, self.conexion, *args, **kwargs))
+            except Exception as error:
+                futuro.set_exception(error)
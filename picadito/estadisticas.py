@@ -0,0 +1,287 @@
+"""Estadísticas materializadas por jugador: partidos, victorias, rachas y ratings.
+
+``estadisticas_jugador`` y ``ratings_jugador`` se actualizan dentro de la misma
+transacción que cada alta o baja de partidos; las funciones ``reconstruir_*``
+las recalculan desde cero para reparar la base. Un partido nuevo posterior a
+todos se suma en el lugar, sin releer el historial. Elo y las rachas dependen
+del orden, así que un partido atrasado o una baja obligan a reproducir los
+partidos siguientes: ``reproducir_partidos`` lo hace desde el último punto de
+control anterior (``puntos_control``, cada ``INTERVALO_CONTROL`` partidos).
+"""
+from itertools import groupby
+
+from picadito.elo import RATING_INICIAL, aplicar_partido
+
+# Condición de victoria de una fila de partido_jugadores (pj) unida a partidos (p)
+VICTORIA_SQL = "((pj.equipo = 1 AND p.goles1 > p.goles2) OR (pj.equipo = 2 AND p.goles2 > p.goles1))"
+# Goles a favor menos goles en contra del equipo del jugador en ese partido
+DIFERENCIA_GOLES_SQL = "(CASE WHEN pj.equipo = 1 THEN p.goles1 - p.goles2 ELSE p.goles2 - p.goles1 END)"
+# Partidos entre puntos de control de reproducir_partidos
+INTERVALO_CONTROL = 100
+
+
+def actualizar_estadisticas(cursor, jugador_ids=None):
+    # Recalcular la fila de estadisticas_jugador de los jugadores indicados (todos si es None)
+    import numpy as np
+    from picadito.rachas import calcular_rachas
+
+    if jugador_ids is None:
+        jugador_ids = [fila[0] for fila in cursor.execute("SELECT id FROM jugadores").fetchall()]
+        filtro, parametros = "", []
+    else:
+        jugador_ids = sorted({int(jugador_id) for jugador_id in jugador_ids})
+        filtro, parametros = f"WHERE pj.jugador_id IN ({','.join('?' * len(jugador_ids))})", jugador_ids
+    if not jugador_ids:
+        return
+
+    # Resultados de cada jugador en orden cronológico
+    query = f"""
+    SELECT pj.jugador_id, p.fecha,
+           CASE WHEN {VICTORIA_SQL} THEN 'G' WHEN p.goles1 = p.goles2 THEN 'E' ELSE 'P' END as resultado,
+           {DIFERENCIA_GOLES_SQL} as diferencia_goles
+    FROM partido_jugadores pj
+    JOIN partidos p ON p.id = pj.partido_id
+    {filtro}
+    ORDER BY pj.jugador_id, p.fecha, p.id
+    """
+    filas = cursor.execute(query, parametros).fetchall()
+    ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+    resultados = np.array([fila[2] for fila in filas], dtype=object)
+    diferencias = np.array([fila[3] for fila in filas], dtype=np.int64)
+
+    # Rachas, partidos y victorias de cada jugador en una sola pasada
+    con_partidos, racha_actual, racha_maxima = calcular_rachas(ids, resultados == 'G')
+    ultimos = np.searchsorted(ids, con_partidos, side='right') - 1
+    partidos_jugados = np.bincount(np.searchsorted(con_partidos, ids), minlength=len(con_partidos))
+    victorias = np.bincount(np.searchsorted(con_partidos, ids), weights=resultados == 'G', minlength=len(con_partidos))
+    diferencia_goles = np.bincount(np.searchsorted(con_partidos, ids), weights=diferencias, minlength=len(con_partidos))
+
+    estadisticas = {jugador_id: (jugador_id, 0, 0, 0, None, None, 0, 0) for jugador_id in jugador_ids}
+    for i, jugador_id in enumerate(con_partidos.tolist()):
+        if jugador_id not in estadisticas:
+            continue
+        fecha, resultado = filas[ultimos[i]][1:3]
+        estadisticas[jugador_id] = (jugador_id, int(partidos_jugados[i]), int(victorias[i]),
+                                    int(racha_actual[i]), resultado, fecha, int(racha_maxima[i]),
+                                    int(diferencia_goles[i]))
+    cursor.executemany("""INSERT OR REPLACE INTO estadisticas_jugador
+                          (jugador_id, partidos_jugados, victorias, racha_actual, ultimo_resultado, ultima_fecha, racha_maxima,
+                           diferencia_goles)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", list(estadisticas.values()))
+
+
+def sumar_partido_estadisticas(cursor, participantes, fecha, goles1, goles2):
+    # Suma un partido recién insertado, posterior a todos los demás; participantes son filas (partido_id, jugador_id, equipo)
+    filas = []
+    for _, jugador_id, equipo in participantes:
+        diferencia = goles1 - goles2 if equipo == 1 else goles2 - goles1
+        victoria = int(diferencia > 0)
+        filas.append((jugador_id, victoria, victoria, 'G' if victoria else 'E' if diferencia == 0 else 'P', str(fecha), victoria, diferencia))
+    cursor.executemany("""INSERT INTO estadisticas_jugador
+                          (jugador_id, partidos_jugados, victorias, racha_actual, ultimo_resultado, ultima_fecha, racha_maxima,
+                           diferencia_goles)
+                          VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+                          ON CONFLICT (jugador_id) DO UPDATE SET
+                              partidos_jugados = partidos_jugados + 1,
+                              victorias = victorias + excluded.victorias,
+                              racha_actual = CASE WHEN excluded.victorias THEN racha_actual + 1 ELSE 0 END,
+                              racha_maxima = MAX(racha_maxima, CASE WHEN excluded.victorias THEN racha_actual + 1 ELSE 0 END),
+                              ultimo_resultado = excluded.ultimo_resultado,
+                              ultima_fecha = excluded.ultima_fecha,
+                              diferencia_goles = diferencia_goles + excluded.diferencia_goles""", filas)
+
+
+def reconstruir_estadisticas(conexion):
+    # Reconstrucción completa de estadisticas_jugador, para reparar la tabla
+    with conexion:
+        cursor = conexion.cursor()
+        cursor.execute("DELETE FROM estadisticas_jugador")
+        actualizar_estadisticas(cursor)
+
+
+def _guardar_control(cursor, fecha, partido_id):
+    # Punto de control con el estado actual de las tablas, que ya incluye el partido (fecha, partido_id)
+    cursor.execute("""INSERT OR REPLACE INTO puntos_control
+                      SELECT ?, ?, e.jugador_id, r.rating, e.partidos_jugados, e.victorias, e.racha_actual,
+                             e.racha_maxima, e.diferencia_goles, e.ultima_fecha, e.ultimo_resultado
+                      FROM estadisticas_jugador e
+                      LEFT JOIN ratings_jugador r ON r.jugador_id = e.jugador_id
+                      WHERE e.partidos_jugados > 0""", (str(fecha), int(partido_id)))
+
+
+def controlar_partido(cursor, fecha, partido_id):
+    # Tras sumar un partido al final del historial, agrega un punto de control si desde el último pasaron
+    # INTERVALO_CONTROL partidos
+    ultimo = cursor.execute("SELECT fecha, partido_id FROM puntos_control ORDER BY fecha DESC, partido_id DESC LIMIT 1").fetchone()
+    filtro, parametros = ("WHERE (fecha, id) > (?, ?)", ultimo) if ultimo else ("", ())
+    if cursor.execute(f"SELECT COUNT(*) FROM partidos {filtro}", parametros).fetchone()[0] >= INTERVALO_CONTROL:
+        _guardar_control(cursor, fecha, partido_id)
+
+
+def reproducir_partidos(cursor, fecha=None, partido_id=None):
+    """Reproduce el historial desde la posición ``(fecha, partido_id)``, o entero si ``fecha`` es None.
+
+    Cada ``INTERVALO_CONTROL`` partidos se guarda en ``puntos_control`` el
+    rating y las estadísticas de todos los jugadores; se parte del último
+    punto anterior a la posición, así que borrar o agregar un partido reciente
+    reproduce unos pocos partidos y no todo el historial. Los partidos
+    borrados o agregados en la posición ya deben estar borrados o agregados.
+    Reescribe ``ratings_jugador``, ``estadisticas_jugador`` y los puntos de
+    control siguientes, sin confirmar la transacción.
+    """
+    escritura = cursor.connection.cursor()
+    # [partidos_jugados, victorias, racha_actual, racha_maxima, diferencia_goles, ultima_fecha, ultimo_resultado] por jugador
+    estados, ratings = {}, {}
+    control = None
+    if fecha is not None:
+        control = cursor.execute("""SELECT fecha, partido_id FROM puntos_control WHERE (fecha, partido_id) < (?, ?)
+                                    ORDER BY fecha DESC, partido_id DESC LIMIT 1""", (str(fecha), int(partido_id))).fetchone()
+    if control is None:
+        escritura.execute("DELETE FROM puntos_control")
+        filtro, parametros = "", ()
+    else:
+        for jugador_id, rating, *estado in cursor.execute("""
+                SELECT jugador_id, rating, partidos_jugados, victorias, racha_actual, racha_maxima, diferencia_goles,
+                       ultima_fecha, ultimo_resultado
+                FROM puntos_control WHERE fecha = ? AND partido_id = ?""", control).fetchall():
+            estados[jugador_id] = estado
+            if rating is not None:
+                ratings[jugador_id] = rating
+        escritura.execute("DELETE FROM puntos_control WHERE (fecha, partido_id) > (?, ?)", control)
+        filtro, parametros = "WHERE (p.fecha, p.id) > (?, ?)", control
+
+    query = f"""
+    SELECT p.id, p.fecha, p.goles1, p.goles2, pj.jugador_id, pj.equipo
+    FROM partidos p
+    JOIN partido_jugadores pj ON pj.partido_id = p.id
+    {filtro}
+    ORDER BY p.fecha, p.id, pj.jugador_id
+    """
+    reproducidos = 0
+    for (partido, fecha_partido, goles1, goles2), filas in groupby(cursor.execute(query, parametros), key=lambda fila: fila[:4]):
+        equipos = [(fila[4], fila[5]) for fila in filas]
+        aplicar_partido(ratings, [jugador_id for jugador_id, equipo in equipos if equipo == 1],
+                        [jugador_id for jugador_id, equipo in equipos if equipo == 2], goles1, goles2)
+        for jugador_id, equipo in equipos:
+            diferencia = goles1 - goles2 if equipo == 1 else goles2 - goles1
+            estado = estados.get(jugador_id)
+            if estado is None:
+                estado = estados[jugador_id] = [0, 0, 0, 0, 0, None, None]
+            estado[0] += 1
+            estado[4] += diferencia
+            estado[5] = fecha_partido
+            if diferencia > 0:
+                estado[1] += 1
+                estado[2] += 1
+                estado[3] = max(estado[3], estado[2])
+                estado[6] = 'G'
+            else:
+                estado[2] = 0
+                estado[6] = 'E' if diferencia == 0 else 'P'
+        reproducidos += 1
+        if reproducidos % INTERVALO_CONTROL == 0:
+            escritura.executemany("INSERT INTO puntos_control VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  [(fecha_partido, partido, jugador_id, ratings.get(jugador_id), *estado)
+                                   for jugador_id, estado in estados.items()])
+
+    # Las tablas quedan como el estado final de todos los jugadores; sin partidos, en cero y sin rating
+    jugadores = [fila[0] for fila in cursor.execute("SELECT id FROM jugadores").fetchall()]
+    escritura.executemany("""INSERT OR REPLACE INTO estadisticas_jugador
+                             (jugador_id, partidos_jugados, victorias, racha_actual, racha_maxima, diferencia_goles,
+                              ultima_fecha, ultimo_resultado)
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                          [(jugador_id, *estados.get(jugador_id, (0, 0, 0, 0, 0, None, None))) for jugador_id in jugadores])
+    escritura.execute("DELETE FROM ratings_jugador")
+    escritura.executemany("INSERT INTO ratings_jugador (jugador_id, rating) VALUES (?, ?)", ratings.items())
+
+
+def actualizar_ratings(cursor):
+    # Recalcular todos los ratings (y con ellos estadísticas y puntos de control) reproduciendo todo el historial
+    reproducir_partidos(cursor)
+
+
+def registrar_ratings_partido(cursor, equipo1_ids, equipo2_ids, goles1, goles2):
+    # Actualización incremental de los ratings de los participantes de un partido
+    participantes = list(equipo1_ids) + list(equipo2_ids)
+    if not participantes:
+        return
+    marcadores = ','.join('?' * len(participantes))
+    ratings = dict(cursor.execute(f"SELECT jugador_id, rating FROM ratings_jugador WHERE jugador_id IN ({marcadores})", participantes).fetchall())
+    aplicar_partido(ratings, equipo1_ids, equipo2_ids, goles1, goles2)
+    cursor.executemany("INSERT OR REPLACE INTO ratings_jugador (jugador_id, rating) VALUES (?, ?)",
+                       [(jugador_id, ratings[jugador_id]) for jugador_id in participantes])
+
+
+def reconstruir_ratings(conexion):
+    with conexion:
+        actualizar_ratings(conexion.cursor())
+
+
+def obtener_victorias_jugador(conexion, jugador):
+    query = """
+    SELECT COALESCE(e.victorias, 0) as victorias
+    FROM jugadores j
+    LEFT JOIN estadisticas_jugador e ON e.jugador_id = j.id
+    WHERE j.nombre = ?
+    """
+    result = conexion.execute(query, (jugador,)).fetchone()
+    return result[0] if result else 0
+
+
+def obtener_victorias_jugadores(conexion):
+    # Victorias de todos los jugadores en una sola consulta, indexadas por nombre
+    query = """
+    SELECT j.nombre, COALESCE(e.victorias, 0) as victorias
+    FROM jugadores j
+    LEFT JOIN estadisticas_jugador e ON e.jugador_id = j.id
+    """
+    return dict(conexion.execute(query).fetchall())
+
+
+def obtener_diferencias_goles(conexion):
+    # Diferencia de goles acumulada de todos los jugadores, indexada por nombre
+    query = """
+    SELECT j.nombre, COALESCE(e.diferencia_goles, 0) as diferencia_goles
+    FROM jugadores j
+    LEFT JOIN estadisticas_jugador e ON e.jugador_id = j.id
+    """
+    return dict(conexion.execute(query).fetchall())
+
+
+def obtener_ratings_jugadores(conexion):
+    # Rating Elo de todos los jugadores, indexado por nombre
+    query = """
+    SELECT j.nombre, COALESCE(r.rating, ?) as rating
+    FROM jugadores j
+    LEFT JOIN ratings_jugador r ON r.jugador_id = j.id
+    """
+    return dict(conexion.execute(query, (RATING_INICIAL,)).fetchall())
+
+
+def obtener_estadisticas_jugadores(conexion):
+    # Lectura de la tabla materializada: una fila por jugador
+    import pandas as pd
+
+    query = """
+    SELECT
+        j.id,
+        j.nombre,
+        j.posicion,
+        COALESCE(e.partidos_jugados, 0) as partidos_jugados,
+        COALESCE(e.victorias, 0) as victorias,
+        COALESCE(e.racha_actual, 0) as racha_ganadora,
+        COALESCE(e.racha_maxima, 0) as racha_maxima,
+        COALESCE(r.rating, ?) as rating
+    FROM
+        jugadores j
+    LEFT JOIN
+        estadisticas_jugador e ON e.jugador_id = j.id
+    LEFT JOIN
+        ratings_jugador r ON r.jugador_id = j.id
+    ORDER BY
+        racha_ganadora DESC, victorias DESC, partidos_jugados DESC
+    """
+    df = pd.read_sql_query(query, conexion, params=(RATING_INICIAL,))
+    df['porcentaje_victorias'] = (df['victorias'] / df['partidos_jugados'] * 100).round(2)
+    df['porcentaje_victorias'] = df['porcentaje_victorias'].fillna(0)
+    return df
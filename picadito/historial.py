@@ -0,0 +1,136 @@
+"""Posiciones a una fecha, ventanas móviles y forma de cada jugador.
+
+``cargar_historial`` lee una sola vez todas las participaciones y arma un
+``HistorialAcumulado``: las filas quedan ordenadas por jugador y fecha, y para
+partidos, victorias y diferencia de goles se guardan sumas acumuladas
+(*prefix sums*). El total de cualquier tramo del historial de un jugador es
+la resta de dos acumulados, y el tramo se ubica con un ``searchsorted`` sobre
+una clave ``(jugador, día)``, para todos los jugadores a la vez. Así una tabla
+"al día X", "últimos 90 días" o "últimos 10 partidos" no vuelve a recorrer
+los partidos, aunque el historial abarque varios años.
+"""
+from picadito.estadisticas import DIFERENCIA_GOLES_SQL, VICTORIA_SQL
+
+# La clave de búsqueda es jugador * DESPLAZAMIENTO + día; sobra lugar para cualquier fecha razonable
+DESPLAZAMIENTO = 1 << 32
+
+
+def cargar_historial(conexion):
+    # Participaciones de todos los jugadores con fecha válida, ordenadas por jugador y cronológicamente
+    import numpy as np
+    import pandas as pd
+
+    query = f"""
+    SELECT pj.jugador_id, j.nombre, p.fecha,
+           CASE WHEN {VICTORIA_SQL} THEN 1 ELSE 0 END as victoria,
+           {DIFERENCIA_GOLES_SQL} as diferencia_goles
+    FROM partido_jugadores pj
+    JOIN partidos p ON p.id = pj.partido_id
+    JOIN jugadores j ON j.id = pj.jugador_id
+    ORDER BY pj.jugador_id, p.fecha, p.id
+    """
+    filas = pd.read_sql_query(query, conexion)
+    fechas = pd.to_datetime(filas['fecha'], errors='coerce')
+    filas = filas[fechas.notna()]
+    dias = fechas[fechas.notna()].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return HistorialAcumulado(filas['jugador_id'].to_numpy(np.int64), filas['nombre'].to_numpy(object), dias,
+                              filas['victoria'].to_numpy(np.int64), filas['diferencia_goles'].fillna(0).to_numpy(np.int64))
+
+
+class HistorialAcumulado:
+    """Sumas acumuladas de partidos, victorias y diferencia de goles por jugador.
+
+    Los arreglos recibidos están alineados, una fila por participación, y
+    ordenados por jugador y fecha. Las fechas son días (``datetime64[D]``
+    como entero) y los resultados se consultan con fechas ``datetime.date``
+    o texto ISO.
+    """
+
+    def __init__(self, jugador_ids, nombres, dias, victorias, diferencias_goles):
+        import numpy as np
+
+        orden = np.lexsort((np.arange(len(dias)), dias, jugador_ids))
+        jugador_ids, nombres, dias = jugador_ids[orden], nombres[orden], dias[orden]
+        self.jugador_ids, self.inicio, codigos = np.unique(jugador_ids, return_index=True, return_inverse=True)
+        self.fin = np.append(self.inicio[1:], len(jugador_ids))
+        self.nombres = nombres[self.inicio]
+        self.dias = dias
+        self._clave = codigos * DESPLAZAMIENTO + (dias + DESPLAZAMIENTO // 2)
+        # Acumulados con un cero adelante: el tramo [a, b) suma acumulado[b] - acumulado[a]
+        self._victorias = np.concatenate([[0], np.cumsum(victorias[orden])])
+        self._diferencias = np.concatenate([[0], np.cumsum(diferencias_goles[orden])])
+
+    def _posicion(self, dia):
+        # Primera fila posterior al día, para cada jugador (el fin de su historial hasta ese día)
+        import numpy as np
+        claves = np.arange(len(self.jugador_ids)) * DESPLAZAMIENTO + (dia + DESPLAZAMIENTO // 2)
+        return np.searchsorted(self._clave, claves, side='right')
+
+    def tabla(self, hasta=None, dias=None, ultimos=None):
+        """Posiciones con los partidos hasta la fecha ``hasta`` (inclusive; todos si es None).
+
+        ``dias`` limita la ventana a los últimos días antes de ``hasta`` y
+        ``ultimos`` a los últimos partidos de cada jugador. Sólo aparecen los
+        jugadores con partidos en la ventana.
+        """
+        import numpy as np
+        import pandas as pd
+
+        fin = self.fin if hasta is None else self._posicion(_dia(hasta))
+        inicio = self.inicio
+        if dias is not None:
+            referencia = _dia(hasta) if hasta is not None else int(self.dias.max(initial=0))
+            inicio = np.maximum(inicio, self._posicion(referencia - int(dias)))
+        if ultimos is not None:
+            inicio = np.maximum(inicio, fin - int(ultimos))
+        inicio = np.minimum(inicio, fin)
+
+        partidos_jugados = fin - inicio
+        victorias = self._victorias[fin] - self._victorias[inicio]
+        tabla = pd.DataFrame({
+            'jugador_id': self.jugador_ids,
+            'nombre': self.nombres,
+            'partidos_jugados': partidos_jugados,
+            'victorias': victorias,
+            'porcentaje_victorias': np.round(np.divide(victorias * 100.0, partidos_jugados, out=np.zeros(len(fin)),
+                                                       where=partidos_jugados > 0), 2),
+            'diferencia_goles': self._diferencias[fin] - self._diferencias[inicio],
+        })
+        tabla = tabla[tabla['partidos_jugados'] > 0]
+        return tabla.sort_values(by=['porcentaje_victorias', 'victorias', 'partidos_jugados'],
+                                 ascending=[False, False, False]).reset_index(drop=True)
+
+    def forma(self, jugador_id, ventana=10):
+        """Evolución partido a partido de un jugador.
+
+        Devuelve fecha, victorias acumuladas, porcentaje de victorias
+        acumulado, porcentaje en los últimos ``ventana`` partidos y diferencia
+        de goles acumulada; vacío si el jugador no tiene partidos.
+        """
+        import numpy as np
+        import pandas as pd
+
+        i = np.searchsorted(self.jugador_ids, jugador_id)
+        if i == len(self.jugador_ids) or self.jugador_ids[i] != jugador_id:
+            return pd.DataFrame(columns=['fecha', 'partido', 'victorias', 'porcentaje_victorias',
+                                         f'porcentaje_ultimos_{ventana}', 'diferencia_goles'])
+        inicio, fin = int(self.inicio[i]), int(self.fin[i])
+        posiciones = np.arange(inicio + 1, fin + 1)
+        partidos = posiciones - inicio
+        victorias = self._victorias[posiciones] - self._victorias[inicio]
+        desde = np.maximum(posiciones - ventana, inicio)
+        return pd.DataFrame({
+            'fecha': self.dias[inicio:fin].astype('datetime64[D]'),
+            'partido': partidos,
+            'victorias': victorias,
+            'porcentaje_victorias': np.round(victorias * 100.0 / partidos, 2),
+            f'porcentaje_ultimos_{ventana}': np.round((self._victorias[posiciones] - self._victorias[desde]) * 100.0 /
+                                                      (posiciones - desde), 2),
+            'diferencia_goles': self._diferencias[posiciones] - self._diferencias[inicio],
+        })
+
+
+def _dia(fecha):
+    # Fecha (date o texto ISO) como número de día, en la misma escala que HistorialAcumulado.dias
+    import numpy as np
+    return int(np.datetime64(str(fecha), 'D').astype(np.int64))
@@ -0,0 +1,171 @@
+"""Medición de tiempos, consultas y trabajo de SQLite por rerun y por sección.
+
+Un ``Medidor`` se engancha a las conexiones con ``set_trace_callback`` (cuenta
+cada sentencia y recuerda su texto) y ``set_progress_handler`` (cuenta pasos
+de la máquina virtual de SQLite, de a ``PASOS_POR_AVISO``). SQLite no expone
+a Python las filas recorridas por una consulta; los pasos son la mejor
+aproximación disponible y crecen con ellas.
+
+Lo medido es de cada sesión: una ``Medicion`` guarda los registros, las
+sentencias y el perfil de una sesión, y ``Medidor.iniciar_rerun`` la asocia
+al contexto (``contextvars``) del rerun en curso. Los ganchos cuentan para la
+medición del contexto que ejecuta la sentencia, así que sesiones simultáneas
+no se mezclan; sin una medición en el contexto ``medir`` no hace nada y los
+ganchos vuelven enseguida.
+
+Los ganchos se instalan una sola vez, con ``enganchar`` al crear la conexión,
+no se quitan, y sólo van en conexiones que usa un hilo por vez: si otro hilo
+ejecuta una sentencia en la misma conexión mientras un gancho corre (o se
+cambia), los dos pueden trabarse (uno espera el lock de SQLite con el GIL
+tomado y el otro, dentro de SQLite, espera el GIL para su gancho).
+"""
+import cProfile
+import contextvars
+import io
+import json
+import pstats
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Cada cuántas instrucciones de la máquina virtual de SQLite se suma un paso
+PASOS_POR_AVISO = 1000
+# Registros que se conservan por sesión; los más viejos se descartan
+CAPACIDAD_REGISTROS = 5000
+# SQLite pasa las sentencias con los parámetros ya reemplazados: textos, números y NULL vuelven a ser "?"
+_LITERALES = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?\b|\bNULL\b")
+
+# Medición de la sesión que corre en este contexto, o None si no mide
+_medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    """Registros de tiempo y actividad de SQLite de una sesión, con perfilado opcional por rerun."""
+
+    def __init__(self, capacidad=CAPACIDAD_REGISTROS):
+        self.registros = deque(maxlen=capacidad)
+        self.sentencias = Counter()
+        self.perfil = None
+        self.perfilar_proximo = False
+        self.rerun = 0
+        self.consultas = 0
+        self.pasos = 0
+        self._inicio_rerun = None
+        self._perfilador = None
+        self._lock = threading.Lock()
+
+    def registrar(self, registro):
+        with self._lock:
+            self.registros.append(registro)
+
+    def iniciar_rerun(self):
+        # Abre un rerun nuevo; uno anterior que no llegó a finalizar_rerun (st.rerun, st.stop) no se registra
+        self._cerrar_perfil()
+        self.rerun += 1
+        self._inicio_rerun = (time.perf_counter(), self.consultas, self.pasos)
+        if self.perfilar_proximo:
+            self.perfilar_proximo = False
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+
+    def finalizar_rerun(self):
+        self._cerrar_perfil()
+        if self._inicio_rerun is None:
+            return
+        inicio, consultas, pasos = self._inicio_rerun
+        self._inicio_rerun = None
+        self.registrar({'rerun': self.rerun, 'tipo': 'rerun', 'nombre': 'rerun', 'momento': time.time(),
+                        'segundos': time.perf_counter() - inicio,
+                        'consultas': self.consultas - consultas, 'pasos': self.pasos - pasos})
+
+    def _cerrar_perfil(self):
+        # Las 40 funciones con más tiempo acumulado del rerun perfilado, como texto
+        if self._perfilador is None:
+            return
+        self._perfilador.disable()
+        salida = io.StringIO()
+        pstats.Stats(self._perfilador, stream=salida).sort_stats('cumulative').print_stats(40)
+        self.perfil = {'rerun': self.rerun, 'texto': salida.getvalue()}
+        self._perfilador = None
+
+    def resumen(self):
+        # Un DataFrame con los registros, del más reciente al más viejo
+        import pandas as pd
+        with self._lock:
+            registros = list(self.registros)
+        columnas = ['rerun', 'tipo', 'nombre', 'momento', 'segundos', 'consultas', 'pasos']
+        return pd.DataFrame(registros, columns=columnas).iloc[::-1].reset_index(drop=True)
+
+    def exportar_jsonl(self):
+        with self._lock:
+            return ''.join(json.dumps(registro) + '\n' for registro in self.registros)
+
+    def reiniciar(self):
+        with self._lock:
+            self.registros.clear()
+            self.sentencias.clear()
+        self.perfil = None
+
+
+class Medidor:
+    """Ganchos de SQLite compartidos por el proceso que cuentan para la medición de cada sesión."""
+
+    def enganchar(self, conexion):
+        # Instala los ganchos en una conexión nueva que nunca usan dos hilos a la vez
+        conexion.set_trace_callback(self._al_ejecutar)
+        conexion.set_progress_handler(self._al_avanzar, PASOS_POR_AVISO)
+
+    def iniciar_rerun(self, medicion=None):
+        # Asocia la medición de la sesión (None si no mide) al rerun en curso
+        _medicion_actual.set(medicion)
+        if medicion is not None:
+            medicion.iniciar_rerun()
+
+    def finalizar_rerun(self):
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.finalizar_rerun()
+
+    def _al_ejecutar(self, sentencia):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return
+        medicion.consultas += 1
+        # Sentencias agrupadas por su forma, sin parámetros ni espacios de más
+        medicion.sentencias[_LITERALES.sub('?', ' '.join(sentencia.split()))[:200]] += 1
+
+    def _al_avanzar(self):
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.pasos += 1
+        return 0
+
+    @contextmanager
+    def medir(self, nombre, tipo='funcion'):
+        # Tiempo, sentencias y pasos de SQLite del bloque; se registra aunque el bloque termine con una excepción
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            yield
+            return
+        inicio, consultas, pasos = time.perf_counter(), medicion.consultas, medicion.pasos
+        try:
+            yield
+        finally:
+            medicion.registrar({'rerun': medicion.rerun, 'tipo': tipo, 'nombre': nombre, 'momento': time.time(),
+                                'segundos': time.perf_counter() - inicio,
+                                'consultas': medicion.consultas - consultas, 'pasos': medicion.pasos - pasos})
+
+    def funcion(self, nombre=None):
+        # Decorador: mide cada llamada con el nombre de la función
+        def decorar(funcion):
+            etiqueta = nombre or funcion.__name__
+
+            @wraps(funcion)
+            def medida(*args, **kwargs):
+                with self.medir(etiqueta):
+                    return funcion(*args, **kwargs)
+            return medida
+        return decorar
@@ -0,0 +1,219 @@
+"""Reparto de un plantel en más de dos equipos y fixture de todos contra todos.
+
+Para jornadas de 3 a 6 equipos el *meet-in-the-middle* de ``picadito.balanceo``
+no aplica. ``dividir_en_equipos`` minimiza la diferencia entre el equipo más
+fuerte y el más débil (suma de pesos) respetando las restricciones de
+posiciones en cada equipo:
+
+* Exacto: si la cantidad de repartos distintos no pasa de
+  ``LIMITE_REPARTOS_EXACTOS`` se enumeran todos como una matriz de NumPy (el
+  equipo del primer jugador libre se completa con combinaciones del resto,
+  así no se repiten repartos que sólo difieren en la numeración de los
+  equipos) y se evalúan por lotes.
+* Heurístico: siembra golosa (cada jugador, de mayor a menor peso, va al
+  equipo más débil con lugar) seguida de descenso por intercambios entre
+  equipos, evaluando todos los intercambios de una vez, con perturbaciones
+  al azar y reinicios hasta agotar el tiempo o alcanzar la cota inferior. Con 40
+  jugadores termina muy por debajo del segundo.
+"""
+import math
+import time
+from itertools import combinations
+
+import numpy as np
+
+from picadito.balanceo import DEFENSOR, DELANTERO, MEDIOCAMPISTA
+
+# Hasta esta cantidad de repartos distintos se busca el óptimo exacto, en unas decenas de milisegundos
+# (12 jugadores en 4 equipos son 15400; 15 en 3 son 126126 y ya van al heurístico)
+LIMITE_REPARTOS_EXACTOS = 20000
+# Vueltas seguidas sin mejorar antes de reiniciar el heurístico desde un reparto al azar
+REINICIO = 50
+
+
+def cantidad_repartos(jugadores, cantidad_equipos):
+    # Repartos en equipos del mismo tamaño sin contar el orden de los equipos: n! / (m!^k * k!)
+    por_equipo = jugadores // cantidad_equipos
+    return math.factorial(jugadores) // (math.factorial(por_equipo) ** cantidad_equipos * math.factorial(cantidad_equipos))
+
+
+def _repartos(n, k, m):
+    # Todos los repartos como matriz (repartos, n) con el equipo de cada jugador, armada equipo por equipo:
+    # en cada paso el primer jugador libre abre el equipo siguiente con cada combinación de los demás libres
+    equipo_de = np.full((1, n), -1, dtype=np.int8)
+    for t in range(k):
+        # Jugadores libres de cada reparto parcial, en orden (todos tienen la misma cantidad)
+        libres = np.flatnonzero(equipo_de.ravel() == -1).reshape(len(equipo_de), -1) % n
+        companeros = list(combinations(range(1, libres.shape[1]), m - 1))
+        companeros = np.array(companeros, dtype=np.int64).reshape(len(companeros), m - 1)
+        filas = np.repeat(np.arange(len(equipo_de)), len(companeros))
+        elegidos = np.concatenate([libres[filas, :1],
+                                   np.take_along_axis(libres[filas], np.tile(companeros, (len(libres), 1)), axis=1)], axis=1)
+        equipo_de = equipo_de[filas]
+        equipo_de[np.arange(len(equipo_de))[:, None], elegidos] = t
+    return equipo_de
+
+
+def _costos(sumas, conteos, max_defensores, min_mediocampistas, min_delanteros, escala):
+    # Violación de restricciones (pesada por escala) más la diferencia entre el equipo más y menos fuerte.
+    # El desvío medio respecto del promedio, dividido por escala, sólo desempata: sin él, los intercambios
+    # que acercan a los equipos del medio no cambian la diferencia y el descenso se queda en una meseta.
+    violacion = (np.maximum(conteos[..., 0] - max_defensores, 0) +
+                 np.maximum(min_mediocampistas - conteos[..., 1], 0) +
+                 np.maximum(min_delanteros - conteos[..., 2], 0)).sum(axis=-1)
+    desvio = np.abs(sumas - sumas.mean(axis=-1, keepdims=True)).mean(axis=-1)
+    return violacion * escala + sumas.max(axis=-1) - sumas.min(axis=-1) + desvio / escala
+
+
+def dividir_en_equipos(pesos, posiciones, cantidad_equipos, jugadores_por_equipo, max_defensores,
+                       min_mediocampistas, min_delanteros, tiempo_limite=0.5, semilla=None):
+    """Reparte los jugadores en ``cantidad_equipos`` equipos de ``jugadores_por_equipo``.
+
+    Devuelve ``(equipos, sumas, diferencia)``: una lista de listas de índices,
+    la suma de pesos de cada equipo y la diferencia entre la mayor y la menor.
+    ``None`` si no hay exactamente ``cantidad_equipos * jugadores_por_equipo``
+    jugadores o ningún reparto encontrado cumple las restricciones.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    posiciones = np.asarray(posiciones, dtype=object)
+    n = len(pesos)
+    k, m = int(cantidad_equipos), int(jugadores_por_equipo)
+    if k < 2 or m < 1 or n != k * m:
+        return None
+
+    # Una fila por jugador con un 1 en la columna de su posición (defensor, mediocampista, delantero)
+    roles = np.column_stack([posiciones == DEFENSOR, posiciones == MEDIOCAMPISTA,
+                             posiciones == DELANTERO]).astype(np.int64)
+    totales_roles = roles.sum(axis=0)
+    if (totales_roles[0] > k * max_defensores or totales_roles[1] < k * min_mediocampistas or
+            totales_roles[2] < k * min_delanteros):
+        return None
+    restricciones = (max_defensores, min_mediocampistas, min_delanteros)
+    escala = 1 + np.abs(pesos).sum()
+
+    enteros = np.all(pesos == np.round(pesos))
+    # Cota inferior: con pesos enteros, si el total no se divide en partes iguales la diferencia es al menos 1
+    cota = float(pesos.sum() % k != 0) if enteros else 0.0
+
+    if cantidad_repartos(n, k) <= LIMITE_REPARTOS_EXACTOS:
+        mejor = _exacto(pesos, roles, k, m, restricciones, escala)
+    else:
+        mejor = _heuristico(pesos, roles, k, m, restricciones, escala, cota, tiempo_limite, semilla)
+    if mejor is None:
+        return None
+
+    equipo_de, costo = mejor
+    if costo >= escala:
+        return None
+    equipos = [sorted(int(j) for j in np.flatnonzero(equipo_de == t)) for t in range(k)]
+    # Numerar los equipos por su primer jugador, como en la división en dos
+    equipos.sort(key=lambda equipo: equipo[0])
+    sumas = [pesos[equipo].sum() for equipo in equipos]
+    if enteros:
+        sumas = [int(suma) for suma in sumas]
+    return equipos, sumas, max(sumas) - min(sumas)
+
+
+def _exacto(pesos, roles, k, m, restricciones, escala, tamano_lote=20000):
+    # Todos los repartos, evaluados por lotes con la pertenencia codificada como equipo de cada jugador
+    repartos = _repartos(len(pesos), k, m)
+    mejor, mejor_costo = None, np.inf
+    for desde in range(0, len(repartos), tamano_lote):
+        equipo_de = repartos[desde:desde + tamano_lote]
+        pertenencia = np.eye(k, dtype=np.float64)[equipo_de]
+        sumas = np.einsum('rnk,n->rk', pertenencia, pesos)
+        conteos = np.einsum('rnk,nc->rkc', pertenencia, roles)
+        costos = _costos(sumas, conteos, *restricciones, escala)
+        i = int(np.argmin(costos))
+        if costos[i] < mejor_costo:
+            mejor, mejor_costo = equipo_de[i].astype(np.int64), float(costos[i])
+    return None if mejor is None else (mejor, mejor_costo)
+
+
+def _heuristico(pesos, roles, k, m, restricciones, escala, cota, tiempo_limite, semilla):
+    n = len(pesos)
+    azar = np.random.default_rng(semilla)
+
+    # Siembra golosa: de mayor a menor peso, cada jugador al equipo más débil que tenga lugar
+    equipo_de = np.empty(n, dtype=np.int64)
+    sumas = np.zeros(k)
+    tamanos = np.zeros(k, dtype=np.int64)
+    for j in np.argsort(-pesos, kind='stable'):
+        con_lugar = np.flatnonzero(tamanos < m)
+        t = con_lugar[np.argmin(sumas[con_lugar])]
+        equipo_de[j] = t
+        sumas[t] += pesos[j]
+        tamanos[t] += 1
+
+    def estado(equipo_de):
+        pertenencia = np.eye(k, dtype=np.float64)[equipo_de]
+        return pesos @ pertenencia, roles.T @ pertenencia
+
+    def descender(equipo_de):
+        # Mejor intercambio entre dos jugadores de equipos distintos, hasta que ninguno mejore
+        sumas, conteos = estado(equipo_de)
+        conteos = conteos.T
+        actual = float(_costos(sumas, conteos, *restricciones, escala))
+        while True:
+            # Sumas y conteos de los k equipos tras cambiar i por j: i sale de su equipo y entra j, y viceversa
+            pertenencia = np.eye(k)[equipo_de]
+            cambio = pertenencia[None, :, :] - pertenencia[:, None, :]
+            delta_pesos = (pesos[None, :] - pesos[:, None])[:, :, None] * -cambio
+            nuevas_sumas = sumas + delta_pesos
+            delta_roles = (roles[None, :, :] - roles[:, None, :])[:, :, None, :] * -cambio[..., None]
+            nuevos_conteos = conteos + delta_roles
+            costos = _costos(nuevas_sumas, nuevos_conteos, *restricciones, escala)
+            costos[equipo_de[:, None] == equipo_de[None, :]] = np.inf
+            i, j = np.unravel_index(np.argmin(costos), costos.shape)
+            if costos[i, j] >= actual - 1e-9:
+                return equipo_de, actual
+            equipo_de[i], equipo_de[j] = equipo_de[j], equipo_de[i]
+            sumas, conteos, actual = nuevas_sumas[i, j], nuevos_conteos[i, j], float(costos[i, j])
+
+    inicio = time.perf_counter()
+    actual, costo_actual = descender(equipo_de)
+    mejor, costo_mejor = actual.copy(), costo_actual
+
+    def diferencia(equipo_de):
+        sumas, _ = estado(equipo_de)
+        return sumas.max() - sumas.min()
+
+    sin_mejora = 0
+    while (costo_mejor >= escala or diferencia(mejor) > cota + 1e-9) and time.perf_counter() - inicio < tiempo_limite:
+        # Perturbar la mejor con algunos intercambios al azar entre equipos distintos y volver a descender;
+        # tras muchas vueltas sin mejorar se reinicia desde un reparto al azar
+        if sin_mejora >= REINICIO:
+            candidato = np.repeat(np.arange(k), m)[azar.permutation(n)]
+            sin_mejora = 0
+        else:
+            candidato = mejor.copy()
+            for _ in range(int(azar.integers(1, max(2, m)))):
+                i = int(azar.integers(n))
+                j = int(azar.choice(np.flatnonzero(candidato != candidato[i])))
+                candidato[i], candidato[j] = candidato[j], candidato[i]
+        candidato, costo_candidato = descender(candidato)
+        sin_mejora += 1
+        if costo_candidato < costo_mejor - 1e-9:
+            mejor, costo_mejor = candidato.copy(), costo_candidato
+            sin_mejora = 0
+    return mejor, costo_mejor
+
+
+def fixture_todos_contra_todos(cantidad_equipos):
+    """Rondas de un todos contra todos por el método del círculo.
+
+    Devuelve una lista de rondas, cada una con pares ``(local, visitante)`` de
+    números de equipo desde 0. Con una cantidad impar, en cada ronda un equipo
+    queda libre.
+    """
+    equipos = list(range(cantidad_equipos))
+    if cantidad_equipos % 2:
+        equipos.append(None)
+    rondas = []
+    for ronda in range(len(equipos) - 1):
+        mitad = len(equipos) // 2
+        pares = zip(equipos[:mitad], reversed(equipos[mitad:]))
+        rondas.append([(a, b) if ronda % 2 == 0 else (b, a) for a, b in pares if a is not None and b is not None])
+        # El primero queda fijo y el resto rota una posición
+        equipos = [equipos[0], equipos[-1]] + equipos[1:-1]
+    return rondas
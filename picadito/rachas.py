@@ -0,0 +1,39 @@
+"""Cálculo de rachas ganadoras por jugador.
+
+Recibe el historial de resultados de todos los jugadores ya ordenado (por
+jugador y, dentro de cada jugador, cronológicamente) y en una sola pasada
+vectorizada obtiene la racha en curso y la mejor racha histórica de cada uno.
+
+Es la técnica de *gaps-and-islands*: cada partido no ganado (o el comienzo del
+historial de un jugador) marca un corte, un ``maximum.accumulate`` propaga la
+posición del último corte y la racha en cada partido es la distancia a ese
+corte. No depende de Streamlit ni de pandas.
+"""
+import numpy as np
+
+
+def calcular_rachas(jugadores, victorias):
+    """Devuelve ``(ids, racha_actual, racha_maxima)`` con un elemento por jugador.
+
+    ``jugadores`` y ``victorias`` (1 si ganó, 0 si empató o perdió) están
+    alineados y ordenados por jugador y luego por fecha ascendente. Un empate
+    corta la racha igual que una derrota.
+    """
+    jugadores = np.asarray(jugadores)
+    victorias = np.asarray(victorias, dtype=bool)
+    if len(jugadores) == 0:
+        vacio = np.empty(0, dtype=np.int64)
+        return jugadores, vacio, vacio
+
+    posiciones = np.arange(len(jugadores), dtype=np.int64)
+    inicio = np.ones(len(jugadores), dtype=bool)
+    inicio[1:] = jugadores[1:] != jugadores[:-1]
+    inicios = np.flatnonzero(inicio)
+    finales = np.append(inicios[1:], len(jugadores)) - 1
+
+    # Último corte antes de cada partido: un partido no ganado o el inicio del jugador
+    cortes = np.where(~victorias, posiciones, np.where(inicio, posiciones - 1, -1))
+    cortes = np.maximum.accumulate(cortes)
+    racha = posiciones - cortes
+
+    return jugadores[inicios], racha[finales], np.maximum.reduceat(racha, inicios)
@@ -0,0 +1,546 @@
+"""Acceso a la base SQLite: esquema, migraciones, altas, bajas y consultas.
+
+Todas las funciones reciben la conexión como primer argumento y las escrituras
+confirman su propia transacción. Las consultas que devuelven tablas usan
+pandas, que se importa recién al llamarlas.
+
+Las conexiones usan WAL (los lectores no esperan a los escritores) y esperan
+hasta ``TIEMPO_ESPERA`` segundos si otra conexión tiene el lock de escritura;
+``con_reintentos`` repite una transacción completa si aun así la base sigue
+ocupada.
+"""
+import json
+import sqlite3
+import time
+
+from picadito.estadisticas import (
+    controlar_partido, reconstruir_ratings, registrar_ratings_partido,
+    reproducir_partidos, sumar_partido_estadisticas,
+)
+
+RUTA_BASE = 'picadito.db'
+VERSION_ESQUEMA = 8
+# Segundos que una conexión espera el lock de escritura antes de fallar con "database is locked"
+TIEMPO_ESPERA = 5.0
+# Resultados de generación que se conservan; al pasar el límite se descartan los usados hace más tiempo
+CAPACIDAD_RESULTADOS = 200
+
+
+def conectar(ruta=RUTA_BASE):
+    # Conexión compartible entre hilos, en modo WAL, con espera por lock y el esquema al día
+    conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=TIEMPO_ESPERA)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute(f"PRAGMA busy_timeout = {int(TIEMPO_ESPERA * 1000)}")
+    con_reintentos(crear_esquema, conexion)
+    return conexion
+
+
+def base_ocupada(error):
+    # Errores de lock que se resuelven reintentando más tarde
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in str(error) or 'busy' in str(error))
+
+
+def con_reintentos(funcion, *args, intentos=5, espera=0.05, **kwargs):
+    # Llama a funcion (una transacción completa) y la repite con espera creciente mientras la base esté ocupada
+    for intento in range(intentos):
+        try:
+            return funcion(*args, **kwargs)
+        except sqlite3.OperationalError as error:
+            if not base_ocupada(error) or intento == intentos - 1:
+                raise
+            time.sleep(espera * 2 ** intento)
+
+
+def crear_esquema(conexion):
+    # Crear tablas si no existen y aplicar migraciones pendientes
+    cursor = conexion.cursor()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS jugadores
+                      (id INTEGER PRIMARY KEY, nombre TEXT, posicion TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS partidos
+                      (id INTEGER PRIMARY KEY, fecha TEXT, equipo1 TEXT, equipo2 TEXT, goles1 INTEGER, goles2 INTEGER)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS equipos_generados
+                      (id INTEGER PRIMARY KEY, fecha TEXT, equipo1 TEXT, equipo2 TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS equipos_generados_jugadores
+                      (equipo_generado_id INTEGER, jugador_id INTEGER, equipo INTEGER NOT NULL,
+                       PRIMARY KEY (equipo_generado_id, jugador_id),
+                       FOREIGN KEY (equipo_generado_id) REFERENCES equipos_generados(id),
+                       FOREIGN KEY (jugador_id) REFERENCES jugadores(id))''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS partido_jugadores
+                      (partido_id INTEGER, jugador_id INTEGER, equipo INTEGER,
+                       PRIMARY KEY (partido_id, jugador_id),
+                       FOREIGN KEY (partido_id) REFERENCES partidos(id),
+                       FOREIGN KEY (jugador_id) REFERENCES jugadores(id))''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_partido_jugadores_jugador ON partido_jugadores (jugador_id, partido_id)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS estadisticas_jugador
+                      (jugador_id INTEGER PRIMARY KEY, partidos_jugados INTEGER NOT NULL DEFAULT 0,
+                       victorias INTEGER NOT NULL DEFAULT 0, racha_actual INTEGER NOT NULL DEFAULT 0,
+                       ultimo_resultado TEXT, ultima_fecha TEXT, racha_maxima INTEGER NOT NULL DEFAULT 0,
+                       diferencia_goles INTEGER NOT NULL DEFAULT 0,
+                       FOREIGN KEY (jugador_id) REFERENCES jugadores(id))''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_partidos_fecha ON partidos (fecha, id)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ratings_jugador
+                      (jugador_id INTEGER PRIMARY KEY, rating REAL NOT NULL,
+                       FOREIGN KEY (jugador_id) REFERENCES jugadores(id))''')
+    # Rating y estadísticas de todos los jugadores tras el partido (fecha, partido_id), cada INTERVALO_CONTROL
+    # partidos: un alta o baja en el historial se reproduce desde el último punto anterior
+    cursor.execute('''CREATE TABLE IF NOT EXISTS puntos_control
+                      (fecha TEXT, partido_id INTEGER, jugador_id INTEGER, rating REAL,
+                       partidos_jugados INTEGER NOT NULL, victorias INTEGER NOT NULL, racha_actual INTEGER NOT NULL,
+                       racha_maxima INTEGER NOT NULL, diferencia_goles INTEGER NOT NULL, ultima_fecha TEXT,
+                       ultimo_resultado TEXT,
+                       PRIMARY KEY (fecha, partido_id, jugador_id)) WITHOUT ROWID''')
+    # Jornadas de más de dos equipos: el plantel de cada equipo y el fixture, cuyos cruces apuntan al partido jugado
+    cursor.execute('''CREATE TABLE IF NOT EXISTS jornadas
+                      (id INTEGER PRIMARY KEY, fecha TEXT NOT NULL, cantidad_equipos INTEGER NOT NULL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jornadas_fecha ON jornadas (fecha)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS jornada_equipos
+                      (jornada_id INTEGER, jugador_id INTEGER, equipo INTEGER NOT NULL,
+                       PRIMARY KEY (jornada_id, jugador_id),
+                       FOREIGN KEY (jornada_id) REFERENCES jornadas(id),
+                       FOREIGN KEY (jugador_id) REFERENCES jugadores(id))''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS jornada_partidos
+                      (id INTEGER PRIMARY KEY, jornada_id INTEGER NOT NULL, ronda INTEGER NOT NULL,
+                       equipo_local INTEGER NOT NULL, equipo_visitante INTEGER NOT NULL, partido_id INTEGER,
+                       FOREIGN KEY (jornada_id) REFERENCES jornadas(id),
+                       FOREIGN KEY (partido_id) REFERENCES partidos(id))''')
+    # Resultados de generación ya calculados, por huella del plantel y los parámetros
+    cursor.execute('''CREATE TABLE IF NOT EXISTS resultados_generacion
+                      (clave TEXT PRIMARY KEY, resultado TEXT NOT NULL, usado REAL NOT NULL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resultados_generacion_usado ON resultados_generacion (usado)")
+    conexion.commit()
+
+    version_esquema = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version_esquema < 1:
+        migrar_equipos_a_ids(cursor, 'partidos', 'partido_jugadores', 'partido_id')
+        conexion.commit()
+    if version_esquema < 5:
+        # v3 agregó racha_maxima y v5 diferencia_goles; se completan al reproducir el historial (v8)
+        columnas = [fila[1] for fila in cursor.execute("PRAGMA table_info(estadisticas_jugador)").fetchall()]
+        if 'racha_maxima' not in columnas:
+            cursor.execute("ALTER TABLE estadisticas_jugador ADD COLUMN racha_maxima INTEGER NOT NULL DEFAULT 0")
+        if 'diferencia_goles' not in columnas:
+            cursor.execute("ALTER TABLE estadisticas_jugador ADD COLUMN diferencia_goles INTEGER NOT NULL DEFAULT 0")
+    if version_esquema < 8:
+        # v4 agregó ratings_jugador y v8 puntos_control; reproducir el historial completa ambas y las estadísticas
+        reconstruir_ratings(conexion)
+    if version_esquema < 6:
+        migrar_equipos_a_ids(cursor, 'equipos_generados', 'equipos_generados_jugadores', 'equipo_generado_id')
+        conexion.commit()
+    if version_esquema < 7:
+        # Una sola fila de equipos generados por fecha: se conserva la última y se agrega el índice único
+        duplicados = [(fila[0],) for fila in cursor.execute("""
+            SELECT id FROM equipos_generados
+            WHERE id NOT IN (SELECT MAX(id) FROM equipos_generados GROUP BY fecha)
+        """).fetchall()]
+        cursor.executemany("DELETE FROM equipos_generados_jugadores WHERE equipo_generado_id = ?", duplicados)
+        cursor.executemany("DELETE FROM equipos_generados WHERE id = ?", duplicados)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_equipos_generados_fecha ON equipos_generados (fecha)")
+        conexion.commit()
+    cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    conexion.commit()
+
+
+def migrar_equipos_a_ids(cursor, origen, destino, clave):
+    # Migración única: los equipos guardados como texto en origen pasan a filas (clave, jugador_id, equipo) en destino
+    ids = dict(cursor.execute("SELECT nombre, id FROM jugadores").fetchall())
+    filas = []
+    for fila_id, equipo1, equipo2 in cursor.execute(f"SELECT id, equipo1, equipo2 FROM {origen}").fetchall():
+        for equipo, nombres in ((1, equipo1), (2, equipo2)):
+            for nombre in (nombres or '').split(','):
+                jugador_id = ids.get(nombre.strip())
+                if jugador_id is not None:
+                    filas.append((fila_id, jugador_id, equipo))
+    cursor.executemany(f"INSERT OR IGNORE INTO {destino} ({clave}, jugador_id, equipo) VALUES (?, ?, ?)", filas)
+
+
+# Jugadores
+
+def agregar_jugador(conexion, nombre, posicion):
+    conexion.execute("INSERT INTO jugadores (nombre, posicion) VALUES (?, ?)", (nombre, posicion))
+    conexion.commit()
+
+
+def obtener_jugadores(conexion):
+    import pandas as pd
+    return pd.read_sql_query("SELECT id, nombre, posicion FROM jugadores ORDER BY nombre", conexion)
+
+
+def obtener_posiciones(conexion):
+    # Posición de cada jugador, indexada por nombre
+    return dict(conexion.execute("SELECT nombre, posicion FROM jugadores").fetchall())
+
+
+def actualizar_jugador(conexion, jugador_id, nombre, posicion):
+    with conexion:
+        cursor = conexion.cursor()
+        cursor.execute("UPDATE jugadores SET nombre = ?, posicion = ? WHERE id = ?", (nombre, posicion, jugador_id))
+        olvidar_resultados_generacion(cursor)
+
+
+def quitar_jugadores(cursor, jugador_ids):
+    # Borra jugadores y todo lo que los referencia, sin confirmar la transacción.
+    # Los partidos quedan, con los nombres guardados como texto, pero sin esos participantes.
+    filas = [(int(jugador_id),) for jugador_id in jugador_ids]
+    primeros = [primero for fila in filas for primero in cursor.execute("""
+        SELECT p.fecha, p.id FROM partido_jugadores pj JOIN partidos p ON p.id = pj.partido_id
+        WHERE pj.jugador_id = ? ORDER BY p.fecha, p.id LIMIT 1""", fila)]
+    cursor.executemany("DELETE FROM partido_jugadores WHERE jugador_id = ?", filas)
+    if primeros:
+        # Sin ellos cambian los promedios de sus equipos: los demás se reproducen desde su primer partido
+        reproducir_partidos(cursor, *min(primeros))
+    cursor.executemany("DELETE FROM estadisticas_jugador WHERE jugador_id = ?", filas)
+    cursor.executemany("DELETE FROM ratings_jugador WHERE jugador_id = ?", filas)
+    cursor.executemany("DELETE FROM jornada_equipos WHERE jugador_id = ?", filas)
+    cursor.executemany("DELETE FROM equipos_generados_jugadores WHERE jugador_id = ?", filas)
+    cursor.executemany("DELETE FROM jugadores WHERE id = ?", filas)
+    if filas:
+        olvidar_resultados_generacion(cursor)
+
+
+def borrar_jugadores(conexion, jugador_ids):
+    with conexion:
+        quitar_jugadores(conexion.cursor(), jugador_ids)
+
+
+def borrar_jugador(conexion, jugador_id):
+    borrar_jugadores(conexion, [jugador_id])
+
+
+def guardar_cambios_jugadores(conexion, original, editado):
+    # Diferencias entre la tabla original y la editada, calculadas con un merge por id.
+    # Sólo se borran los ids que faltan en la tabla editada; las filas con el nombre vacío se ignoran.
+    vacio = lambda nombres: nombres.fillna('').astype(str).str.strip() == ''
+    nuevos = editado[editado['id'].isna()]
+    existentes = editado.dropna(subset=['id']).astype({'id': 'int64'})
+    cambios = original.merge(existentes, on='id', how='left', suffixes=('', '_editado'), indicator=True)
+    borrados = cambios.loc[cambios['_merge'] == 'left_only', 'id']
+    sin_nombre = int(vacio(nuevos['nombre']).sum()) + int(((cambios['_merge'] == 'both') & vacio(cambios['nombre_editado'])).sum())
+    nuevos = nuevos[~vacio(nuevos['nombre'])]
+    cambios = cambios[~vacio(cambios['nombre_editado'])]
+    modificados = cambios[(cambios['_merge'] == 'both') &
+                          ((cambios['nombre'] != cambios['nombre_editado']) |
+                           (cambios['posicion'] != cambios['posicion_editado']))]
+
+    # Todas las altas, bajas y modificaciones en una sola transacción
+    with conexion:
+        cursor = conexion.cursor()
+        cursor.executemany("UPDATE jugadores SET nombre = ?, posicion = ? WHERE id = ?",
+                           modificados[['nombre_editado', 'posicion_editado', 'id']].itertuples(index=False, name=None))
+        cursor.executemany("INSERT INTO jugadores (nombre, posicion) VALUES (?, ?)",
+                           nuevos[['nombre', 'posicion']].itertuples(index=False, name=None))
+        quitar_jugadores(cursor, borrados.tolist())
+        if len(modificados):
+            olvidar_resultados_generacion(cursor)
+    return {'actualizados': len(modificados), 'agregados': len(nuevos), 'borrados': len(borrados),
+            'sin_nombre': sin_nombre}
+
+
+# Partidos
+
+def insertar_partido(cursor, ids, fecha, equipo1, equipo2, goles1, goles2):
+    # Inserta el partido y sus participantes sin confirmar la transacción; ids mapea nombre -> id.
+    # Devuelve el id del partido y las filas (partido_id, jugador_id, equipo) insertadas.
+    cursor.execute("INSERT INTO partidos (fecha, equipo1, equipo2, goles1, goles2) VALUES (?, ?, ?, ?, ?)",
+                   (fecha, ','.join(equipo1), ','.join(equipo2), goles1, goles2))
+    partido_id = cursor.lastrowid
+    # Un nombre repetido en los dos equipos queda una sola vez, en el primero
+    participantes = {}
+    for equipo, nombres in ((1, equipo1), (2, equipo2)):
+        for nombre in nombres:
+            if nombre in ids:
+                participantes.setdefault(ids[nombre], (partido_id, ids[nombre], equipo))
+    participantes = list(participantes.values())
+    cursor.executemany("INSERT OR IGNORE INTO partido_jugadores (partido_id, jugador_id, equipo) VALUES (?, ?, ?)",
+                       participantes)
+    return partido_id, participantes
+
+
+def anotar_partido(cursor, fecha, equipo1, equipo2, goles1, goles2):
+    # Partido, participantes, estadísticas y ratings sin confirmar la transacción; devuelve el id del partido
+    ids = dict(cursor.execute("SELECT nombre, id FROM jugadores").fetchall())
+    ultima_fecha = cursor.execute("SELECT MAX(fecha) FROM partidos").fetchone()[0]
+    partido_id, participantes = insertar_partido(cursor, ids, fecha, equipo1, equipo2, goles1, goles2)
+    if ultima_fecha is not None and str(fecha) < ultima_fecha:
+        # Elo y las rachas dependen del orden: se reproducen los partidos desde el nuevo
+        reproducir_partidos(cursor, fecha, partido_id)
+    else:
+        sumar_partido_estadisticas(cursor, participantes, fecha, goles1, goles2)
+        # Los equipos en orden de id, como al reproducir, para que los promedios den exactamente lo mismo
+        registrar_ratings_partido(cursor,
+                                  sorted(jugador_id for _, jugador_id, equipo in participantes if equipo == 1),
+                                  sorted(jugador_id for _, jugador_id, equipo in participantes if equipo == 2),
+                                  goles1, goles2)
+        controlar_partido(cursor, fecha, partido_id)
+    olvidar_resultados_generacion(cursor)
+    return partido_id
+
+
+def registrar_partido(conexion, fecha, equipo1, equipo2, goles1, goles2):
+    # El partido, sus participantes, las estadísticas y los ratings se guardan en una misma transacción
+    with conexion:
+        return anotar_partido(conexion.cursor(), fecha, equipo1, equipo2, goles1, goles2)
+
+
+def borrar_partidos(conexion, partido_ids):
+    # Borrado en bloque: una sola sentencia por tabla y un solo commit
+    partido_ids = [int(partido_id) for partido_id in partido_ids]
+    if not partido_ids:
+        return
+    marcadores = ','.join('?' * len(partido_ids))
+    with conexion:
+        cursor = conexion.cursor()
+        desde = cursor.execute(f"SELECT fecha, id FROM partidos WHERE id IN ({marcadores}) ORDER BY fecha, id LIMIT 1",
+                               partido_ids).fetchone()
+        cursor.execute(f"DELETE FROM partido_jugadores WHERE partido_id IN ({marcadores})", partido_ids)
+        cursor.execute(f"DELETE FROM partidos WHERE id IN ({marcadores})", partido_ids)
+        # Los cruces de una jornada vuelven a quedar pendientes
+        cursor.execute(f"UPDATE jornada_partidos SET partido_id = NULL WHERE partido_id IN ({marcadores})", partido_ids)
+        # Se reproduce desde el último punto de control anterior al primer partido borrado, no todo el historial
+        if desde is not None:
+            reproducir_partidos(cursor, *desde)
+        olvidar_resultados_generacion(cursor)
+
+
+def borrar_partido(conexion, partido_id):
+    borrar_partidos(conexion, [partido_id])
+
+
+def obtener_partidos(conexion):
+    import pandas as pd
+    query = """
+    SELECT id, fecha, equipo1, equipo2, goles1, goles2
+    FROM partidos
+    ORDER BY fecha DESC
+    """
+    return pd.read_sql_query(query, conexion)
+
+
+def filtro_partidos(desde=None, hasta=None, jugador_id=None):
+    # Condiciones de fecha y jugador resueltas en SQL, usando los índices de fecha y de participantes
+    condiciones, parametros = [], []
+    if desde is not None:
+        condiciones.append("p.fecha >= ?")
+        parametros.append(str(desde))
+    if hasta is not None:
+        condiciones.append("p.fecha <= ?")
+        parametros.append(str(hasta))
+    if jugador_id is not None:
+        condiciones.append("EXISTS (SELECT 1 FROM partido_jugadores pj WHERE pj.partido_id = p.id AND pj.jugador_id = ?)")
+        parametros.append(int(jugador_id))
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return where, parametros
+
+
+def obtener_pagina_partidos(conexion, desde=None, hasta=None, jugador_id=None, limite=10, offset=0):
+    import pandas as pd
+    where, parametros = filtro_partidos(desde, hasta, jugador_id)
+    query = f"""
+    SELECT p.id, p.fecha, p.equipo1, p.equipo2, p.goles1, p.goles2
+    FROM partidos p
+    {where}
+    ORDER BY p.fecha DESC, p.id DESC
+    LIMIT ? OFFSET ?
+    """
+    return pd.read_sql_query(query, conexion, params=parametros + [int(limite), int(offset)])
+
+
+def obtener_equipos_partidos(conexion, partido_ids):
+    # Ids de los participantes de cada partido: {partido_id: (ids_equipo1, ids_equipo2)}, sin tocar el texto guardado
+    partido_ids = [int(partido_id) for partido_id in partido_ids]
+    equipos = {partido_id: ([], []) for partido_id in partido_ids}
+    if not partido_ids:
+        return equipos
+    marcadores = ','.join('?' * len(partido_ids))
+    for partido_id, jugador_id, equipo in conexion.execute(
+            f"SELECT partido_id, jugador_id, equipo FROM partido_jugadores WHERE partido_id IN ({marcadores}) ORDER BY partido_id, jugador_id",
+            partido_ids).fetchall():
+        equipos[partido_id][equipo - 1].append(jugador_id)
+    return equipos
+
+
+def contar_partidos(conexion, desde=None, hasta=None, jugador_id=None):
+    where, parametros = filtro_partidos(desde, hasta, jugador_id)
+    return conexion.execute(f"SELECT COUNT(*) FROM partidos p {where}", parametros).fetchone()[0]
+
+
+# Equipos generados
+
+def guardar_equipos_generados(conexion, fecha, equipo1, equipo2):
+    # Un par de equipos por fecha (índice único): upsert y reemplazo de los ids en equipos_generados_jugadores.
+    # El texto queda como referencia.
+    with conexion:
+        cursor = conexion.cursor()
+        cursor.execute("""INSERT INTO equipos_generados (fecha, equipo1, equipo2) VALUES (?, ?, ?)
+                          ON CONFLICT (fecha) DO UPDATE SET equipo1 = excluded.equipo1, equipo2 = excluded.equipo2""",
+                       (fecha, ','.join(equipo1), ','.join(equipo2)))
+        equipo_generado_id = cursor.execute("SELECT id FROM equipos_generados WHERE fecha = ?", (fecha,)).fetchone()[0]
+        cursor.execute("DELETE FROM equipos_generados_jugadores WHERE equipo_generado_id = ?", (equipo_generado_id,))
+        ids = dict(cursor.execute("SELECT nombre, id FROM jugadores").fetchall())
+        cursor.executemany("INSERT OR IGNORE INTO equipos_generados_jugadores (equipo_generado_id, jugador_id, equipo) VALUES (?, ?, ?)",
+                           [(equipo_generado_id, ids[nombre], equipo)
+                            for equipo, nombres in ((1, equipo1), (2, equipo2))
+                            for nombre in nombres if nombre in ids])
+
+
+def obtener_equipos_generados(conexion):
+    import pandas as pd
+    return pd.read_sql_query("SELECT * FROM equipos_generados", conexion)
+
+
+def obtener_equipos_generados_fecha(conexion, fecha):
+    # Ids de los equipos generados para la fecha, (equipo1, equipo2), o None si no hay
+    fila = conexion.execute("SELECT id FROM equipos_generados WHERE fecha = ?", (str(fecha),)).fetchone()
+    if fila is None:
+        return None
+    equipos = {1: [], 2: []}
+    for jugador_id, equipo in conexion.execute("SELECT jugador_id, equipo FROM equipos_generados_jugadores WHERE equipo_generado_id = ?",
+                                               (fila[0],)).fetchall():
+        equipos[equipo].append(jugador_id)
+    return equipos[1], equipos[2]
+
+
+# Jornadas de varios equipos
+
+def guardar_jornada(conexion, fecha, equipos):
+    # Reemplaza la jornada de la fecha por los equipos dados (listas de nombres) y su fixture de todos contra todos
+    from picadito.particion import fixture_todos_contra_todos
+
+    with conexion:
+        cursor = conexion.cursor()
+        anteriores = [(fila[0],) for fila in cursor.execute("SELECT id FROM jornadas WHERE fecha = ?", (str(fecha),)).fetchall()]
+        cursor.executemany("DELETE FROM jornada_partidos WHERE jornada_id = ?", anteriores)
+        cursor.executemany("DELETE FROM jornada_equipos WHERE jornada_id = ?", anteriores)
+        cursor.executemany("DELETE FROM jornadas WHERE id = ?", anteriores)
+
+        cursor.execute("INSERT INTO jornadas (fecha, cantidad_equipos) VALUES (?, ?)", (str(fecha), len(equipos)))
+        jornada_id = cursor.lastrowid
+        ids = dict(cursor.execute("SELECT nombre, id FROM jugadores").fetchall())
+        cursor.executemany("INSERT OR IGNORE INTO jornada_equipos (jornada_id, jugador_id, equipo) VALUES (?, ?, ?)",
+                           [(jornada_id, ids[nombre], equipo)
+                            for equipo, nombres in enumerate(equipos, start=1)
+                            for nombre in nombres if nombre in ids])
+        cursor.executemany("INSERT INTO jornada_partidos (jornada_id, ronda, equipo_local, equipo_visitante) VALUES (?, ?, ?, ?)",
+                           [(jornada_id, ronda, local + 1, visitante + 1)
+                            for ronda, cruces in enumerate(fixture_todos_contra_todos(len(equipos)), start=1)
+                            for local, visitante in cruces])
+    return jornada_id
+
+
+def obtener_jornada(conexion, fecha):
+    # Jornada de la fecha como {'id', 'equipos', 'fixture'}, o None si no hay; equipos va numerado desde 1
+    import pandas as pd
+    fila = conexion.execute("SELECT id, cantidad_equipos FROM jornadas WHERE fecha = ? ORDER BY id DESC LIMIT 1",
+                            (str(fecha),)).fetchone()
+    if fila is None:
+        return None
+    jornada_id, cantidad_equipos = fila
+    equipos = {equipo: [] for equipo in range(1, cantidad_equipos + 1)}
+    for equipo, nombre in conexion.execute("""
+        SELECT je.equipo, j.nombre FROM jornada_equipos je JOIN jugadores j ON j.id = je.jugador_id
+        WHERE je.jornada_id = ? ORDER BY je.equipo, j.nombre
+    """, (jornada_id,)).fetchall():
+        equipos[equipo].append(nombre)
+    fixture = pd.read_sql_query("""
+    SELECT jp.id, jp.ronda, jp.equipo_local, jp.equipo_visitante, jp.partido_id, p.goles1 AS goles_local, p.goles2 AS goles_visitante
+    FROM jornada_partidos jp
+    LEFT JOIN partidos p ON p.id = jp.partido_id
+    WHERE jp.jornada_id = ?
+    ORDER BY jp.ronda, jp.id
+    """, conexion, params=(jornada_id,))
+    return {'id': jornada_id, 'equipos': equipos, 'fixture': fixture}
+
+
+def registrar_partido_jornada(conexion, cruce_id, goles_local, goles_visitante):
+    # Registra el resultado de un cruce del fixture como partido, en la misma transacción que lo vincula
+    with conexion:
+        cursor = conexion.cursor()
+        jornada_id, fecha, local, visitante = cursor.execute("""
+            SELECT jp.jornada_id, jo.fecha, jp.equipo_local, jp.equipo_visitante
+            FROM jornada_partidos jp JOIN jornadas jo ON jo.id = jp.jornada_id
+            WHERE jp.id = ?
+        """, (int(cruce_id),)).fetchone()
+        plantel = {local: [], visitante: []}
+        for equipo, nombre in cursor.execute("""
+            SELECT je.equipo, j.nombre FROM jornada_equipos je JOIN jugadores j ON j.id = je.jugador_id
+            WHERE je.jornada_id = ? AND je.equipo IN (?, ?) ORDER BY j.nombre
+        """, (jornada_id, local, visitante)).fetchall():
+            plantel[equipo].append(nombre)
+        partido_id = anotar_partido(cursor, fecha, plantel[local], plantel[visitante], goles_local, goles_visitante)
+        cursor.execute("UPDATE jornada_partidos SET partido_id = ? WHERE id = ?", (partido_id, int(cruce_id)))
+    return partido_id
+
+
+# Resultados de generación
+
+def obtener_resultado_generacion(conexion, clave):
+    # Resultado guardado para la clave (lo que se pasó a guardar_resultado_generacion), o None; sólo lee
+    fila = conexion.execute("SELECT resultado FROM resultados_generacion WHERE clave = ?", (clave,)).fetchone()
+    return None if fila is None else json.loads(fila[0])
+
+
+def marcar_resultado_usado(conexion, clave):
+    # Un resultado recién reutilizado es el último en descartarse al pasar la capacidad
+    with conexion:
+        conexion.execute("UPDATE resultados_generacion SET usado = ? WHERE clave = ?", (time.time(), clave))
+
+
+def guardar_resultado_generacion(conexion, clave, resultado, capacidad=CAPACIDAD_RESULTADOS):
+    # El resultado se guarda como JSON; pasada la capacidad se descartan los usados hace más tiempo
+    texto = json.dumps(resultado, default=lambda valor: valor.item())
+    with conexion:
+        conexion.execute("INSERT OR REPLACE INTO resultados_generacion (clave, resultado, usado) VALUES (?, ?, ?)",
+                         (clave, texto, time.time()))
+        conexion.execute("""
+            DELETE FROM resultados_generacion
+            WHERE clave NOT IN (SELECT clave FROM resultados_generacion ORDER BY usado DESC LIMIT ?)
+        """, (int(capacidad),))
+
+
+def olvidar_resultados_generacion(cursor):
+    # Cambiaron los pesos o las posiciones: ningún resultado guardado sigue valiendo. No confirma la transacción.
+    cursor.execute("DELETE FROM resultados_generacion")
+
+
+# Importación masiva
+
+def leer_archivo_importacion(archivo):
+    # CSV o JSON (lista de objetos) según la extensión del archivo
+    import pandas as pd
+    nombre = getattr(archivo, 'name', archivo)
+    if str(nombre).lower().endswith('.json'):
+        return pd.read_json(archivo, orient='records', dtype=False, convert_dates=False)
+    return pd.read_csv(archivo)
+
+
+def importar_jugadores(conexion, df):
+    # Alta masiva de jugadores (columnas nombre, posicion); se omiten los nombres ya existentes
+    existentes = {fila[0] for fila in conexion.execute("SELECT nombre FROM jugadores").fetchall()}
+    df = df.dropna(subset=['nombre']).drop_duplicates('nombre')
+    df = df[~df['nombre'].isin(existentes)]
+    with conexion:
+        conexion.executemany("INSERT INTO jugadores (nombre, posicion) VALUES (?, ?)",
+                             df[['nombre', 'posicion']].itertuples(index=False, name=None))
+    return len(df)
+
+
+def importar_partidos(conexion, df):
+    # Carga masiva de partidos históricos (fecha, equipo1, equipo2, goles1, goles2) en una sola transacción.
+    # Los equipos pueden venir como texto separado por comas o como listas de nombres.
+    def nombres(equipo):
+        if isinstance(equipo, str):
+            equipo = equipo.split(',')
+        return [nombre.strip() for nombre in equipo if nombre.strip()]
+
+    with conexion:
+        cursor = conexion.cursor()
+        ids = dict(cursor.execute("SELECT nombre, id FROM jugadores").fetchall())
+        posiciones = []
+        for partido in df.itertuples(index=False):
+            partido_id, _ = insertar_partido(cursor, ids, str(partido.fecha), nombres(partido.equipo1), nombres(partido.equipo2),
+                                             int(partido.goles1), int(partido.goles2))
+            posiciones.append((str(partido.fecha), partido_id))
+        # Los partidos importados pueden ser anteriores a los existentes: se reproduce desde el primero
+        if posiciones:
+            reproducir_partidos(cursor, *min(posiciones))
+        olvidar_resultados_generacion(cursor)
+    return len(df)
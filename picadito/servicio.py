@@ -0,0 +1,197 @@
+"""Operaciones de Picadito sin Streamlit: para scripts, bots y el servicio HTTP.
+
+Un ``Servicio`` mantiene abierta una sola conexión y atiende solicitudes
+como diccionarios JSON con una ``operacion``:
+
+* ``generar``: ``jugadores`` (nombres) y opcionalmente ``jugadores_por_equipo``,
+  ``cantidad_equipos``, ``max_defensores``, ``min_mediocampistas``,
+  ``min_delanteros``, ``ponderacion_victorias``, ``objetivo``,
+  ``ponderacion_goles``, ``ponderacion_posiciones``, ``un_arquero_por_equipo``
+  y ``tiempo_limite``.
+* ``registrar_partido``: ``fecha``, ``equipo1``, ``equipo2``, ``goles1``, ``goles2``.
+* ``posiciones``: tabla general; con ``hasta``, ``dias`` o ``ultimos`` usa las
+  ventanas de ``picadito.historial``.
+
+Los nombres de jugadores tienen que existir en la base. Cualquier error de una
+solicitud vuelve como ``{"error": ...}`` sin cortar el resto del lote.
+
+``atender_lote`` reparte varias solicitudes en un pool de hilos. Las lecturas
+comparten la conexión del servicio y las escrituras pasan por un
+``picadito.escritor.Escritor``, de a una; en modo WAL las lecturas no esperan a
+las escrituras. ``servir`` expone lo mismo por HTTP: ``POST /`` con una
+solicitud o con ``{"lote": [...]}``, y ``GET /posiciones``.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from picadito import equipos, estadisticas, repositorio
+from picadito.escritor import Escritor
+
+# Hilos por defecto para los lotes y el servicio HTTP
+TRABAJADORES = 4
+
+
+class SolicitudInvalida(ValueError):
+    """La solicitud no tiene una operación conocida o le faltan datos."""
+
+
+class Servicio:
+    """Conexión de lectura, escritor y pool de hilos para atender solicitudes."""
+
+    def __init__(self, ruta=repositorio.RUTA_BASE, trabajadores=TRABAJADORES):
+        self.conexion = repositorio.conectar(ruta)
+        self.escritor = Escritor(ruta)
+        self.ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='servicio')
+
+    def cerrar(self):
+        self.ejecutor.shutdown(wait=True)
+        self.escritor.cerrar()
+        self.conexion.close()
+
+    def atender(self, solicitud):
+        # Una solicitud; cualquier error vuelve como {'error': ...} para no cortar un lote
+        try:
+            if not isinstance(solicitud, dict):
+                raise SolicitudInvalida(f"se esperaba un objeto JSON y llegó {type(solicitud).__name__}")
+            operacion = solicitud.get('operacion')
+            if operacion == 'generar':
+                return self.generar(solicitud)
+            if operacion == 'registrar_partido':
+                return self.registrar_partido(solicitud)
+            if operacion == 'posiciones':
+                return self.posiciones(solicitud)
+            raise SolicitudInvalida(f"operación desconocida: {operacion!r}")
+        except Exception as error:
+            return {'error': f"{type(error).__name__}: {error}"}
+
+    def atender_lote(self, solicitudes):
+        # Resultados en el mismo orden que las solicitudes, procesadas en paralelo
+        return list(self.ejecutor.map(self.atender, solicitudes))
+
+    def generar(self, solicitud):
+        jugadores = list(solicitud['jugadores'])
+        cantidad_equipos = int(solicitud.get('cantidad_equipos', 2))
+        if cantidad_equipos < 2:
+            raise SolicitudInvalida("se necesitan al menos dos equipos")
+        por_equipo = int(solicitud.get('jugadores_por_equipo', len(jugadores) // cantidad_equipos))
+        restricciones = (int(solicitud.get('max_defensores', por_equipo)), int(solicitud.get('min_mediocampistas', 0)),
+                         int(solicitud.get('min_delanteros', 0)))
+        objetivo = solicitud.get('objetivo', 'victorias')
+        if por_equipo < 1:
+            raise SolicitudInvalida("cada equipo necesita al menos un jugador")
+        self._verificar_jugadores(jugadores)
+        if len(jugadores) != por_equipo * cantidad_equipos:
+            raise SolicitudInvalida(f"se necesitan {por_equipo * cantidad_equipos} jugadores y hay {len(jugadores)}")
+
+        pesos, posiciones, diferencias_goles = equipos.obtener_datos_balanceo(self.conexion, jugadores, objetivo)
+
+        if cantidad_equipos > 2:
+            from picadito.particion import dividir_en_equipos
+            resultado = dividir_en_equipos(pesos, posiciones, cantidad_equipos, por_equipo, *restricciones,
+                                           tiempo_limite=float(solicitud.get('tiempo_limite', 0.5)))
+            if resultado is None:
+                return {'equipos': None}
+            indices, sumas, diferencia = resultado
+            return {'equipos': [[jugadores[i] for i in equipo] for equipo in indices],
+                    'pesos': sumas, 'diferencia': diferencia}
+
+        criterios = {clave: solicitud[clave] for clave in
+                     ('ponderacion_goles', 'ponderacion_posiciones', 'un_arquero_por_equipo', 'tiempo_limite')
+                     if clave in solicitud}
+        resultado = equipos.dividir_plantel(pesos, posiciones, por_equipo, *restricciones,
+                                            float(solicitud.get('ponderacion_victorias', 1.0)), diferencias_goles,
+                                            **criterios)
+        if resultado is None:
+            return {'equipos': None}
+        (equipo1, equipo2), peso1, peso2, puntaje = equipos.nombrar_division(jugadores, resultado)
+        return {'equipos': [equipo1, equipo2], 'pesos': [peso1, peso2], 'puntaje': puntaje}
+
+    def registrar_partido(self, solicitud):
+        self._verificar_jugadores(list(solicitud['equipo1']) + list(solicitud['equipo2']))
+        partido_id = self.escritor.ejecutar(repositorio.registrar_partido, str(solicitud['fecha']),
+                                            list(solicitud['equipo1']), list(solicitud['equipo2']),
+                                            int(solicitud['goles1']), int(solicitud['goles2']))
+        return {'partido_id': partido_id}
+
+    def _verificar_jugadores(self, nombres):
+        desconocidos = sorted(set(nombres) - set(repositorio.obtener_posiciones(self.conexion)))
+        if desconocidos:
+            raise SolicitudInvalida(f"jugadores desconocidos: {', '.join(map(str, desconocidos))}")
+
+    def posiciones(self, solicitud):
+        ventana = {clave: solicitud[clave] for clave in ('hasta', 'dias', 'ultimos') if solicitud.get(clave) is not None}
+        if ventana:
+            from picadito.historial import cargar_historial
+            tabla = cargar_historial(self.conexion).tabla(**ventana)
+        else:
+            tabla = estadisticas.obtener_estadisticas_jugadores(self.conexion)
+        return {'posiciones': json.loads(tabla.to_json(orient='records'))}
+
+
+def _a_json(valor):
+    # Enteros y flotantes de NumPy a tipos de Python
+    return json.dumps(valor, default=lambda dato: dato.item()).encode()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    servicio = None
+
+    def _responder(self, estado, cuerpo):
+        datos = _a_json(cuerpo)
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/posiciones':
+            self._responder(404, {'error': 'ruta desconocida'})
+            return
+        parametros = {clave: valores[0] for clave, valores in parse_qs(url.query).items()}
+        try:
+            for clave in ('dias', 'ultimos'):
+                if clave in parametros:
+                    parametros[clave] = int(parametros[clave])
+        except ValueError as error:
+            self._responder(400, {'error': f"ValueError: {error}"})
+            return
+        resultado = self.servicio.atender({'operacion': 'posiciones', **parametros})
+        self._responder(400 if 'error' in resultado else 200, resultado)
+
+    def do_POST(self):
+        try:
+            cuerpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as error:
+            self._responder(400, {'error': f"JSON inválido: {error}"})
+            return
+        if isinstance(cuerpo, list):
+            cuerpo = {'lote': cuerpo}
+        if not isinstance(cuerpo, dict):
+            self._responder(400, {'error': "el pedido debe ser un objeto JSON o una lista de objetos"})
+            return
+        if 'lote' in cuerpo:
+            if not isinstance(cuerpo['lote'], list):
+                self._responder(400, {'error': "'lote' debe ser una lista de pedidos"})
+                return
+            self._responder(200, {'resultados': self.servicio.atender_lote(cuerpo['lote'])})
+        else:
+            resultado = self.servicio.atender(cuerpo)
+            self._responder(400 if 'error' in resultado else 200, resultado)
+
+    def log_message(self, formato, *args):
+        # Sin una línea por pedido en la consola
+        pass
+
+
+def servir(servicio, anfitrion='127.0.0.1', puerto=8765):
+    """Atiende HTTP hasta interrumpirlo; cada pedido corre en su propio hilo."""
+    manejador = type('Manejador', (_Manejador,), {'servicio': servicio})
+    servidor = ThreadingHTTPServer((anfitrion, puerto), manejador)
+    try:
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
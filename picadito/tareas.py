@@ -0,0 +1,187 @@
+"""Generación de equipos en segundo plano.
+
+Una ``GeneracionEquipos`` corre la búsqueda exacta en un hilo del ejecutor que
+se le pase y va publicando en sus atributos el progreso y la mejor división
+encontrada hasta el momento. Así la interfaz puede mostrar un resultado
+parcial, cancelar la búsqueda o quedarse con lo encontrado sin esperar al
+final. Los pesos y las posiciones se leen antes, en el hilo que la crea: el
+hilo de trabajo no toca la base.
+
+``Generaciones`` recuerda las últimas generaciones por clave para reutilizar
+el resultado cuando se vuelve a pedir el mismo plantel con los mismos
+parámetros. Como una generación puede estar compartida por varias sesiones,
+cada una se suscribe y la suelta al cancelar; la búsqueda se detiene recién
+cuando la suelta la última. Para que el resultado sobreviva al proceso, ``huella_generacion``
+resume la clave en un hash que sirve para guardarlo en la base, y
+``GeneracionEquipos.recuperada`` lo vuelve a armar como generación terminada.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from picadito.equipos import dividir_plantel, nombrar_alternativas, nombrar_division
+
+
+def clave_generacion(jugadores_disponibles, pesos, posiciones, diferencias_goles, *parametros):
+    # El orden de selección no importa; sí los pesos y los goles, que cambian al registrar partidos
+    plantel = sorted(zip(jugadores_disponibles, (float(peso) for peso in pesos), posiciones,
+                         (int(diferencia) for diferencia in diferencias_goles)))
+    return (tuple(plantel),) + tuple(parametros)
+
+
+def huella_generacion(clave):
+    # Hash estable de una clave de clave_generacion, igual entre procesos (a diferencia de hash())
+    return hashlib.sha256(json.dumps(clave, separators=(',', ':')).encode()).hexdigest()
+
+
+class GeneracionEquipos:
+    """Búsqueda de equipos que corre en otro hilo.
+
+    ``mejor`` tiene el formato de ``equipos.generar_equipos`` y se actualiza
+    cada vez que aparece una división más pareja; ``progreso`` va de 0 a 1.
+    Al terminar, ``completa`` indica si la búsqueda llegó al final o fue
+    cancelada antes. Con ``top`` mayor que cero se evalúan además todas las
+    divisiones y se guardan las ``top`` mejores en ``alternativas``. Los
+    ``criterios`` son los de ``equipos.dividir_plantel``. ``persistida`` indica
+    si el resultado ya está en la base, para no volver a escribirlo desde cada
+    sesión que la reutiliza.
+    """
+
+    def __init__(self, jugadores_disponibles, pesos, posiciones, jugadores_por_equipo, max_defensores,
+                 min_mediocampistas, min_delanteros, ponderacion_victorias, top=0, **criterios):
+        self.jugadores_disponibles = list(jugadores_disponibles)
+        self.top = top
+        self._parametros = (pesos, posiciones, jugadores_por_equipo, max_defensores,
+                            min_mediocampistas, min_delanteros, ponderacion_victorias)
+        self._criterios = criterios
+        self.progreso = 0.0
+        self.mejor = None
+        self.alternativas = None
+        self.completa = False
+        self.persistida = False
+        self.error = None
+        self._interrumpida = False
+        self._cancelar = threading.Event()
+        self._terminada = threading.Event()
+        self._suscriptores = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def recuperada(cls, jugadores_disponibles, resultado):
+        # Generación ya terminada a partir de lo que devolvió resultado(), sin volver a buscar
+        generacion = cls(jugadores_disponibles, None, None, None, None, None, None, None)
+        generacion.mejor = resultado['mejor']
+        generacion.alternativas = resultado['alternativas']
+        generacion.progreso = 1.0
+        generacion.completa = True
+        generacion.persistida = True
+        generacion._terminada.set()
+        return generacion
+
+    def resultado(self):
+        # Mejor división y alternativas de una generación completa, listas para guardar
+        return {'mejor': self.mejor, 'alternativas': self.alternativas}
+
+    def iniciar(self, ejecutor):
+        # Una generación recuperada ya está terminada: no hay nada que correr
+        if not self.terminada:
+            ejecutor.submit(self._correr)
+        return self
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def suscribir(self):
+        # Una sesión más sigue la generación. Devuelve la función con que la suelta (cancelando si era la
+        # última en seguirla), o None si ya estaba cancelada.
+        with self._lock:
+            if self.cancelada:
+                return None
+            self._suscriptores += 1
+        soltada = []
+
+        def soltar():
+            with self._lock:
+                if soltada:
+                    return
+                soltada.append(True)
+                self._suscriptores -= 1
+                if self._suscriptores == 0:
+                    self._cancelar.set()
+        return soltar
+
+    @property
+    def suscriptores(self):
+        return self._suscriptores
+
+    def esperar(self, tiempo=None):
+        # Devuelve True si la generación terminó dentro del tiempo indicado
+        return self._terminada.wait(tiempo)
+
+    @property
+    def terminada(self):
+        return self._terminada.is_set()
+
+    @property
+    def cancelada(self):
+        return self._cancelar.is_set() and not self.completa
+
+    def _al_progresar(self, fraccion):
+        self.progreso = min(fraccion, 1.0)
+
+    def _al_mejorar(self, division):
+        self.mejor = nombrar_division(self.jugadores_disponibles, division)
+
+    def _detener(self):
+        self._interrumpida = self._cancelar.is_set()
+        return self._interrumpida
+
+    def _correr(self):
+        from picadito.balanceo import evaluar_divisiones
+
+        try:
+            resultado = dividir_plantel(*self._parametros, progreso=self._al_progresar, al_mejorar=self._al_mejorar,
+                                        detener=self._detener, **self._criterios)
+            if resultado is not None:
+                self._al_mejorar(resultado)
+            if self.top and resultado is not None and not self._interrumpida:
+                criterios = {clave: valor for clave, valor in self._criterios.items() if clave != 'tiempo_limite'}
+                alternativas = evaluar_divisiones(*self._parametros, top=self.top, **criterios)
+                self.alternativas = nombrar_alternativas(self.jugadores_disponibles, alternativas)
+            self.completa = not self._interrumpida
+        except Exception as error:
+            self.error = error
+        finally:
+            self._terminada.set()
+
+
+class Generaciones:
+    """Últimas generaciones por clave, descartando las usadas hace más tiempo."""
+
+    def __init__(self, capacidad=16):
+        self.capacidad = capacidad
+        self._por_clave = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener_o_iniciar(self, clave, crear, ejecutor):
+        # Reutiliza la generación de la misma clave salvo que haya sido cancelada o haya fallado.
+        # Devuelve la generación y la función con que quien la pidió la suelta (ver GeneracionEquipos.suscribir).
+        with self._lock:
+            generacion = self._por_clave.get(clave)
+            if generacion is not None and not generacion.cancelada and generacion.error is None:
+                soltar = generacion.suscribir()
+                if soltar is not None:
+                    self._por_clave.move_to_end(clave)
+                    return generacion, soltar
+            generacion = crear()
+            soltar = generacion.suscribir()
+            generacion.iniciar(ejecutor)
+            self._por_clave[clave] = generacion
+            self._por_clave.move_to_end(clave)
+            while len(self._por_clave) > self.capacidad:
+                # Una generación que alguna sesión sigue corriendo queda fuera de la caché, pero no se cancela
+                _, descartada = self._por_clave.popitem(last=False)
+                if descartada.suscriptores == 0:
+                    descartada.cancelar()
+            return generacion, soltar
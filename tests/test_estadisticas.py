@@ -0,0 +1,95 @@
+"""Estadísticas y ratings incrementales contra ``reconstruir_estadisticas`` y ``reconstruir_ratings``."""
+import random
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from picadito import estadisticas, repositorio
+
+NOMBRES = [f"Jugador {i}" for i in range(1, 13)]
+
+
+@pytest.fixture
+def conexion(tmp_path):
+    conexion = repositorio.conectar(str(tmp_path / 'picadito.db'))
+    for nombre in NOMBRES:
+        repositorio.agregar_jugador(conexion, nombre, 'Mediocampista')
+    yield conexion
+    conexion.close()
+
+
+def tablas(conexion):
+    # Estadísticas de los jugadores que jugaron y todos los ratings
+    filas = conexion.execute("SELECT * FROM estadisticas_jugador WHERE partidos_jugados > 0 ORDER BY jugador_id").fetchall()
+    ratings = conexion.execute("SELECT * FROM ratings_jugador ORDER BY jugador_id").fetchall()
+    return filas, ratings
+
+
+def reconstruidas(conexion):
+    # Las mismas tablas recalculadas desde cero, sobre una copia de la base
+    copia = sqlite3.connect(':memory:')
+    conexion.backup(copia)
+    estadisticas.reconstruir_ratings(copia)
+    estadisticas_reproducidas = tablas(copia)[0]
+    estadisticas.reconstruir_estadisticas(copia)
+    assert tablas(copia)[0] == estadisticas_reproducidas
+    return tablas(copia)
+
+
+def fecha_al_azar(azar):
+    return f"2024-{azar.randint(1, 12):02d}-{azar.randint(1, 28):02d}"
+
+
+def registrar_al_azar(conexion, azar, fecha):
+    convocados = azar.sample(NOMBRES, 8)
+    repositorio.registrar_partido(conexion, fecha, convocados[:4], convocados[4:], azar.randint(0, 4), azar.randint(0, 4))
+
+
+def test_altas_al_final_se_suman_en_el_lugar(conexion):
+    azar = random.Random(0)
+    for dia in range(1, 29):
+        registrar_al_azar(conexion, azar, f"2024-02-{dia:02d}")
+        assert tablas(conexion) == reconstruidas(conexion)
+
+
+def test_altas_atrasadas_y_bajas(conexion, monkeypatch):
+    # Puntos de control cada pocos partidos, para reproducir desde uno que no es el primero
+    monkeypatch.setattr(estadisticas, 'INTERVALO_CONTROL', 4)
+    azar = random.Random(1)
+    for _ in range(40):
+        registrar_al_azar(conexion, azar, fecha_al_azar(azar))
+    for paso in range(60):
+        ids = [fila[0] for fila in conexion.execute("SELECT id FROM partidos").fetchall()]
+        if paso % 3 == 0:
+            repositorio.borrar_partidos(conexion, azar.sample(ids, azar.randint(1, 3)))
+        elif paso % 3 == 1:
+            registrar_al_azar(conexion, azar, fecha_al_azar(azar))
+        else:
+            registrar_al_azar(conexion, azar, '2025-01-01')
+        assert tablas(conexion) == reconstruidas(conexion), paso
+
+
+def test_borrar_el_ultimo_partido_deshace_el_alta(conexion):
+    azar = random.Random(2)
+    for _ in range(30):
+        registrar_al_azar(conexion, azar, fecha_al_azar(azar))
+    antes = tablas(conexion)
+    registrar_al_azar(conexion, azar, '2025-01-01')
+    ultimo = conexion.execute("SELECT MAX(id) FROM partidos").fetchone()[0]
+    repositorio.borrar_partido(conexion, ultimo)
+    assert tablas(conexion) == antes
+
+
+def test_importar_y_borrar_jugadores(conexion, monkeypatch):
+    monkeypatch.setattr(estadisticas, 'INTERVALO_CONTROL', 4)
+    azar = random.Random(3)
+    for _ in range(30):
+        registrar_al_azar(conexion, azar, fecha_al_azar(azar))
+    importados = pd.DataFrame([{'fecha': fecha_al_azar(azar), 'equipo1': ','.join(NOMBRES[:3]),
+                                'equipo2': ','.join(NOMBRES[3:6]), 'goles1': 2, 'goles2': 1} for _ in range(5)])
+    repositorio.importar_partidos(conexion, importados)
+    assert tablas(conexion) == reconstruidas(conexion)
+    jugador_id = conexion.execute("SELECT id FROM jugadores WHERE nombre = ?", (NOMBRES[0],)).fetchone()[0]
+    repositorio.borrar_jugador(conexion, jugador_id)
+    assert tablas(conexion) == reconstruidas(conexion)
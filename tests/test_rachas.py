@@ -0,0 +1,70 @@
+"""Rachas de ``picadito.rachas.calcular_rachas`` contra un cálculo partido a partido."""
+import time
+
+import numpy as np
+
+from picadito.rachas import calcular_rachas
+
+
+def rachas_ingenuas(jugadores, resultados):
+    # Racha en curso y mejor racha de cada jugador recorriendo sus resultados ('G', 'E' o 'P') en orden
+    rachas = {}
+    for jugador, resultado in zip(jugadores, resultados):
+        actual, maxima = rachas.get(jugador, (0, 0))
+        actual = actual + 1 if resultado == 'G' else 0
+        rachas[jugador] = (actual, max(maxima, actual))
+    return rachas
+
+
+def historial_al_azar(cantidad_partidos, cantidad_jugadores, semilla):
+    # Participaciones ordenadas por jugador (como las devuelve la consulta de estadísticas), con empates
+    azar = np.random.default_rng(semilla)
+    jugadores = np.sort(azar.integers(1, cantidad_jugadores + 1, cantidad_partidos))
+    resultados = azar.choice(np.array(['G', 'E', 'P']), cantidad_partidos, p=[0.45, 0.15, 0.4])
+    return jugadores, resultados
+
+
+def comparar(jugadores, resultados):
+    ids, racha_actual, racha_maxima = calcular_rachas(jugadores, resultados == 'G')
+    esperadas = rachas_ingenuas(jugadores.tolist(), resultados.tolist())
+    assert ids.tolist() == sorted(esperadas)
+    assert dict(zip(ids.tolist(), zip(racha_actual.tolist(), racha_maxima.tolist()))) == esperadas
+
+
+def test_coincide_con_el_calculo_partido_a_partido():
+    for semilla in range(20):
+        comparar(*historial_al_azar(500, 12, semilla))
+
+
+def test_empates_cortan_la_racha():
+    jugadores = np.array([1, 1, 1, 1, 1, 1])
+    resultados = np.array(['G', 'G', 'E', 'G', 'G', 'G'])
+    ids, racha_actual, racha_maxima = calcular_rachas(jugadores, resultados == 'G')
+    assert ids.tolist() == [1]
+    assert racha_actual.tolist() == [3]
+    assert racha_maxima.tolist() == [3]
+
+
+def test_jugadores_con_un_solo_partido():
+    jugadores = np.array([1, 2, 3, 4])
+    resultados = np.array(['G', 'E', 'P', 'G'])
+    ids, racha_actual, racha_maxima = calcular_rachas(jugadores, resultados == 'G')
+    assert ids.tolist() == [1, 2, 3, 4]
+    assert racha_actual.tolist() == [1, 0, 0, 1]
+    assert racha_maxima.tolist() == [1, 0, 0, 1]
+    comparar(jugadores, resultados)
+
+
+def test_historial_vacio():
+    ids, racha_actual, racha_maxima = calcular_rachas(np.array([], dtype=np.int64), np.array([], dtype=bool))
+    assert len(ids) == len(racha_actual) == len(racha_maxima) == 0
+
+
+def test_cien_mil_partidos():
+    # Correcto y muy por debajo del segundo con un historial sintético de 100.000 participaciones
+    jugadores, resultados = historial_al_azar(100_000, 40, semilla=0)
+    victorias = resultados == 'G'
+    inicio = time.perf_counter()
+    calcular_rachas(jugadores, victorias)
+    assert time.perf_counter() - inicio < 1.0
+    comparar(jugadores, resultados)